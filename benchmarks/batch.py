@@ -0,0 +1,46 @@
+# Compares assembling a directory of generated programs one by one, in parallel with a cold cache and in
+# parallel with a warm cache.
+# Usage: python -m benchmarks.batch [--files N] [--lines N] [--jobs N]
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.suite import generated_source
+from micro0.assembler.assembler import Assembler
+from micro0.assembler.batch import assemble_files
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index in range(args.files):
+            path = os.path.join(directory, f"program{index}.asm")
+            with open(path, "w") as file:
+                # Every file differs, so none of them share a cache entry.
+                file.write(generated_source(args.lines) + f"            db {index & 0xff:#04x}\n")
+            paths.append(path)
+        cache = os.path.join(directory, "cache")
+
+        start = time.perf_counter()
+        for path in paths:
+            with open(path) as file:
+                Assembler().assemble(file)
+        timings = [("one by one", time.perf_counter() - start)]
+        for name in ("cold cache", "warm cache"):
+            start = time.perf_counter()
+            results = assemble_files(paths, cache, max_workers=args.jobs)
+            timings.append((name, time.perf_counter() - start))
+            assert not any(result.error for result in results)
+    for name, elapsed in timings:
+        print(f"{name:12} {elapsed:8.3f}s  {args.files / elapsed:10,.1f} files/s  {timings[0][1] / elapsed:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
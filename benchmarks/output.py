@@ -0,0 +1,46 @@
+# Measures emulated output throughput, in bytes per second, for each CharacterOutput sink.
+# Usage: python -m benchmarks.output [--bytes N]
+import argparse
+import os
+import threading
+import time
+
+from micro0.emulator.sinks import ListSink, RingBufferSink, FileSink, StreamSink
+from micro0.test_programs import PRINTER, make_system
+
+CYCLES_PER_BYTE = 31
+
+
+def measure(sink, count):
+    system = make_system(PRINTER, sink=sink)
+    start = time.perf_counter()
+    system.run(count * CYCLES_PER_BYTE)
+    return count / (time.perf_counter() - start)
+
+
+def drain(sink):
+    for _ in sink:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bytes", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"list:        {measure(ListSink(), args.bytes):12,.0f} bytes/s")
+    print(f"ring buffer: {measure(RingBufferSink(4096), args.bytes):12,.0f} bytes/s")
+    with open(os.devnull, "wb") as file:
+        sink = FileSink(file)
+        print(f"file:        {measure(sink, args.bytes):12,.0f} bytes/s")
+        sink.close()
+    sink = StreamSink()
+    consumer = threading.Thread(target=drain, args=(sink,))
+    consumer.start()
+    print(f"stream:      {measure(sink, args.bytes):12,.0f} bytes/s")
+    sink.close()
+    consumer.join()
+
+
+if __name__ == "__main__":
+    main()
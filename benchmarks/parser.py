@@ -0,0 +1,48 @@
+# Compares the lines per second of the parsita grammar with the streaming parser that Assembler uses, on a
+# generated source, both from a string in memory and streamed from a file on disk.
+# Usage: python -m benchmarks.parser [--lines N] [--repeat N]
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.suite import generated_source
+from micro0.assembler.assembler import AssemblerParsers
+from micro0.assembler.parser import parse
+
+
+def best(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = generated_source(args.lines)
+    lines = source.count("\n")
+    with tempfile.NamedTemporaryFile("w", suffix=".asm", delete=False) as file:
+        file.write(source)
+    try:
+        def streamed():
+            with open(file.name) as stream:
+                return parse(stream)
+
+        results = [("parsita", best(lambda: AssemblerParsers.program.parse(source).unwrap(), args.repeat)),
+                   ("parser", best(lambda: parse(source), args.repeat)),
+                   ("parser, streamed", best(streamed, args.repeat))]
+    finally:
+        os.unlink(file.name)
+    for name, elapsed in results:
+        print(f"{name:18} {lines / elapsed:12,.0f} lines/s  {results[0][1] / elapsed:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Measures how run_jobs scales with the number of worker processes.
+# Usage: python -m benchmarks.pool [--jobs N] [--cycles N]
+import argparse
+import os
+import time
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.pool import Job, run_jobs
+from micro0.test_programs import PRINTER
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--cycles", type=int, default=200000)
+    args = parser.parse_args()
+
+    binary = Assembler().assemble(PRINTER)
+    jobs = [Job(binary, args.cycles, [(0x1000, bytes([job % 0x100]))]) for job in range(args.jobs)]
+    workers = 1
+    baseline = None
+    while workers <= os.cpu_count():
+        start = time.perf_counter()
+        run_jobs(jobs, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:3d} workers: {elapsed:7.3f} s, {args.jobs * args.cycles / elapsed:14,.0f} cycles/s, "
+              f"speedup {baseline / elapsed:5.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
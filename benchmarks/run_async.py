@@ -0,0 +1,59 @@
+# Measures aggregate emulated cycles per second for many machines sharing one asyncio event loop, compared to
+# running the same machines one after another, plus how evenly the loop shared its time between them.
+# Usage: python -m benchmarks.run_async [--machines N] [--cycles N] [--slice N]
+import argparse
+import asyncio
+import time
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.computer import System
+from micro0.test_programs import PRINTER
+
+
+def make_systems(count):
+    binary = Assembler().assemble(PRINTER)
+    systems = [System() for _ in range(count)]
+    for system in systems:
+        system.load(binary)
+    return systems
+
+
+def sequential(count, cycles):
+    systems = make_systems(count)
+    start = time.perf_counter()
+    for system in systems:
+        system.run(cycles)
+    return count * cycles / (time.perf_counter() - start)
+
+
+async def shared(count, cycles, slice):
+    systems = make_systems(count)
+    finished = []
+
+    async def machine(system):
+        await system.run_async(cycles, slice)
+        finished.append(time.perf_counter())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(machine(system) for system in systems))
+    elapsed = time.perf_counter() - start
+    # The first machine to finish should not be far ahead of the last one if the loop is fair.
+    spread = (max(finished) - min(finished)) / elapsed
+    return count * cycles / elapsed, spread
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--machines", type=int, default=200)
+    parser.add_argument("--cycles", type=int, default=100000)
+    parser.add_argument("--slice", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"sequential run: {sequential(args.machines, args.cycles):14,.0f} cycles/s")
+    rate, spread = asyncio.run(shared(args.machines, args.cycles, args.slice))
+    print(f"run_async:      {rate:14,.0f} cycles/s")
+    print(f"finish spread:  {100 * spread:13.1f} % of the run")
+
+
+if __name__ == "__main__":
+    main()
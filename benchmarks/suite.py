@@ -0,0 +1,203 @@
+# Runs the canonical emulator, assembler and simulator workloads and reports emulated cycles/s, assembled
+# lines/s and simulated clocks/s. Results can be written as JSON and compared against a stored baseline;
+# any result more than --threshold slower than the baseline is flagged and the exit status is 1.
+# Usage: python -m benchmarks.suite [--quick] [--repeat N] [--output FILE] [--baseline FILE] [--threshold F]
+import argparse
+import json
+import platform
+import sys
+import time
+
+from myhdl import Signal, TristateSignal, ResetSignal, intbv, block, always, instance, delay, StopSimulation
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.computer import System
+from micro0.simulator.components import Register, Memory, ProgramCounter
+from micro0.test_programs import HELLO_WORLD, MEMCPY, PRINTER
+
+UNITS = {"emulator": "cycles/s", "assembler": "lines/s", "simulator": "clocks/s"}
+
+
+def label(number):
+    # Labels may only contain lower case letters.
+    letters = ""
+    while True:
+        number, digit = divmod(number, 26)
+        letters += chr(ord("a") + digit)
+        if number == 0:
+            return "l" + letters
+
+
+def generated_source(lines):
+    # Straight-line code with a label on every fourth instruction, followed by the data it refers to.
+    mnemonics = ["load", "add", "store", "brz"]
+    output = ["            .org 0x0"]
+    for line in range(lines):
+        prefix = f"{label(line)}:" if line % 4 == 0 else ""
+        target = label(line & ~3) if line % 8 == 7 else "data"
+        output.append(f"{prefix:12}{mnemonics[line % 4]} [{target}] /* line {line} */")
+    output.append("            .org 0xf000")
+    output.append("data:       db 0x00")
+    return "\n".join(output) + "\n"
+
+
+def best(function, repeat):
+    # Runs function repeat times and keeps the fastest (work, seconds) pair.
+    results = [function() for _ in range(repeat)]
+    return min(results, key=lambda result: result[1] / result[0])
+
+
+def run_program(source, translate, runs):
+    binary = Assembler().assemble(source)
+
+    def measure():
+        system = System(translate)
+        cycles = 0
+        start = time.perf_counter()
+        for _ in range(runs):
+            system.load(binary)
+            system.cpu.pc = 0
+            system.cpu.acc = 0
+            cycles += system.run(1 << 30, stop_on_halt=True)
+        return cycles, time.perf_counter() - start
+
+    return measure
+
+
+def run_cycles(source, translate, cycles):
+    binary = Assembler().assemble(source)
+
+    def measure():
+        system = System(translate)
+        system.load(binary)
+        start = time.perf_counter()
+        executed = system.run(cycles)
+        return executed, time.perf_counter() - start
+
+    return measure
+
+
+def assemble(lines):
+    source = generated_source(lines)
+
+    def measure():
+        start = time.perf_counter()
+        Assembler().assemble(source)
+        return lines, time.perf_counter() - start
+
+    return measure
+
+
+def simulate(component, clocks):
+    @block
+    def testbench():
+        clk = Signal(bool(0))
+        toggle = Signal(bool(0))
+        output_enable = Signal(bool(0))
+        data_bus = TristateSignal(intbv(0)[8:])
+        data_bus_stim = data_bus.driver()
+        address_bus = Signal(intbv(0)[16:])
+        if component == "register":
+            reset = ResetSignal(1, active=0, isasync=True)
+            blocks = Register().block(toggle, data_bus, Signal(intbv(0)[8:]), clk, reset)
+        elif component == "memory":
+            blocks = Memory([0] * 0x100).block(toggle, output_enable, address_bus, data_bus, clk)
+        else:
+            pc_bus = TristateSignal(intbv(0)[16:])
+            blocks = ProgramCounter().block(Signal(bool(0)), Signal(bool(0)), Signal(bool(1)), toggle, data_bus,
+                                            pc_bus.driver(), clk)
+
+        @always(delay(10))
+        def clkgen():
+            clk.next = not clk
+
+        @instance
+        def stimulus():
+            # Write, read and release the bus in turn, so the stimulus and the memory never drive it together.
+            for count in range(clocks):
+                yield clk.negedge
+                phase = count % 3
+                toggle.next = phase == 0
+                output_enable.next = phase == 1
+                address_bus.next = count & 0xff
+                data_bus_stim.next = count & 0xff if phase == 0 else None
+            raise StopSimulation
+
+        return clkgen, stimulus, blocks
+
+    def measure():
+        bench = testbench()
+        start = time.perf_counter()
+        bench.run_sim(quiet=1)
+        return clocks, time.perf_counter() - start
+
+    return measure
+
+
+def workloads(quick):
+    scale = 10 if quick else 1
+    for translate, mode in ((True, "translated"), (False, "interpreted")):
+        yield f"emulator.hello_world.{mode}", run_program(HELLO_WORLD, translate, 2000 // scale)
+        yield f"emulator.memcpy.{mode}", run_program(MEMCPY, translate, 100 // scale)
+        yield f"emulator.counting.{mode}", run_cycles(PRINTER, translate, 2000000 // scale)
+    yield "assembler.generated", assemble(20000 // scale)
+    for component in ("register", "memory", "program_counter"):
+        yield f"simulator.{component}", simulate(component, 20000 // scale)
+
+
+def run(quick=False, repeat=3, selected=None):
+    results = {}
+    for name, measure in workloads(quick):
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        work, seconds = best(measure, repeat)
+        results[name] = {"value": work / seconds, "unit": UNITS[name.split(".")[0]]}
+    return {"python": platform.python_version(), "platform": platform.platform(), "quick": quick,
+            "results": results}
+
+
+def compare(report, baseline, threshold):
+    # Returns (name, baseline value, value, relative change) for each result present in both, and the names
+    # of those that got slower by more than threshold.
+    rows = []
+    regressions = []
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        reference = baseline["results"][name]["value"]
+        change = result["value"] / reference - 1
+        rows.append((name, reference, result["value"], change))
+        if change < -threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="run smaller workloads")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", help="run only workloads whose name starts with this")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results stored by an earlier --output")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report = run(args.quick, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if not args.baseline:
+        for name, result in report["results"].items():
+            print(f"{name:36} {result['value']:16,.0f} {result['unit']}")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    rows, regressions = compare(report, baseline, args.threshold)
+    for name, reference, value, change in rows:
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:36} {reference:16,.0f} {value:16,.0f} {100 * change:+7.1f} %{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
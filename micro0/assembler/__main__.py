@@ -0,0 +1,58 @@
+# Assembles many source files in parallel, with an on-disk cache so unchanged files are not parsed again.
+# Usage: python -m micro0.assembler [--format bin|hex|listing] [--output-dir DIR] [--jobs N]
+#                                   [--cache DIR | --no-cache] [--optimize] FILE...
+import argparse
+import os
+import sys
+import time
+
+from micro0.assembler.batch import assemble_files
+
+EXTENSIONS = {"bin": ".bin", "hex": ".hex", "listing": ".lst"}
+
+
+def write(image, path, format):
+    if format == "bin":
+        with open(path, "wb") as file:
+            file.write(bytes(image))
+    else:
+        with open(path, "w") as file:
+            file.write(image.intel_hex() if format == "hex" else image.listing())
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog="python -m micro0.assembler")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--format", choices=sorted(EXTENSIONS), action="append",
+                        help="output format, may be repeated (default: bin)")
+    parser.add_argument("--output-dir", help="where to write the output (default: next to each source)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per cpu)")
+    parser.add_argument("--cache", default=os.environ.get("MICRO0_CACHE",
+                                                          os.path.join(os.path.expanduser("~"), ".cache", "micro0")))
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--optimize", action="store_true")
+    args = parser.parse_args(arguments)
+
+    formats = args.format or ["bin"]
+    start = time.perf_counter()
+    results = assemble_files(args.files, None if args.no_cache else args.cache, args.optimize, "listing" in formats,
+                             args.jobs)
+    failed = 0
+    for result in results:
+        if result.error is not None:
+            failed += 1
+            print(f"{result.path}: {result.error}", file=sys.stderr)
+            continue
+        stem = os.path.splitext(result.path)[0]
+        if args.output_dir is not None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            stem = os.path.join(args.output_dir, os.path.basename(stem))
+        for format in formats:
+            write(result.image, stem + EXTENSIONS[format], format)
+    cached = sum(result.cached for result in results)
+    print(f"{len(results)} files, {cached} from cache, {failed} failed in {time.perf_counter() - start:.3f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
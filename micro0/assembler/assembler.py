@@ -1,5 +1,11 @@
 import parsita as ps
 
+from micro0.assembler import parser
+from micro0.assembler.image import Image, extents
+
+# Part of every batch cache key. Bump it whenever the same source would assemble to different output.
+VERSION = 1
+
 
 class Section:
     def __init__(self, origin, instructions):
@@ -21,6 +27,12 @@ class Instruction:
 
 
 class DirectInstruction(Instruction):
+    mnemonic = None
+
+    def __str__(self):
+        operand = self.address if isinstance(self.address, str) else f"{self.address:#06x}"
+        return f"{self.mnemonic} [{operand}]"
+
     def emit(self, program, symbols, address):
         program[address] = self.opcode
         if isinstance(self.address, str):
@@ -32,25 +44,43 @@ class DirectInstruction(Instruction):
 
 
 class LoadDirect(DirectInstruction):
+    mnemonic = "load"
+
     def __init__(self, address):
         super().__init__(address, 3, 0x01)
 
 
 class StoreDirect(DirectInstruction):
+    mnemonic = "store"
+
     def __init__(self, address):
         super().__init__(address, 3, 0x02)
 
 
 class AddDirect(DirectInstruction):
+    mnemonic = "add"
+
     def __init__(self, address):
         super().__init__(address, 3, 0x03)
 
 
 class BranchIfZeroSet(DirectInstruction):
+    mnemonic = "brz"
+
     def __init__(self, address):
         super().__init__(address, 3, 0x04)
 
 
+class WaitForInterrupt(DirectInstruction):
+    mnemonic = "wait"
+
+    def __init__(self):
+        super().__init__(0x0000, 3, 0x05)
+
+    def __str__(self):
+        return self.mnemonic
+
+
 class LiteralByte:
     def __init__(self, value):
         self.value = value
@@ -59,6 +89,9 @@ class LiteralByte:
     def __eq__(self, other):
         return self.value == other.value and self.size == other.size
 
+    def __str__(self):
+        return f"db {self.value:#04x}"
+
     def emit(self, program, symbols, address):
         program[address] = self.value
 
@@ -71,6 +104,9 @@ class Label:
     def __eq__(self, other):
         return self.value == other.value
 
+    def __str__(self):
+        return f"{self.value}:"
+
     def emit(self, program, symbols, address):
         pass
 
@@ -94,8 +130,10 @@ class AssemblerParsers(ps.ParserContext, whitespace=r"[ \n]*"):
     store_direct = ps.lit("store") >> direct_address > StoreDirect
     add_direct = ps.lit("add") >> direct_address > AddDirect
     branch_if_zero_set_direct = ps.lit("brz") >> direct_address > BranchIfZeroSet
+    wait_for_interrupt = ps.lit("wait") > (lambda _: WaitForInterrupt())
     literal_byte = ps.lit("db") >> hexadecimal > LiteralByte
-    instructions = load_direct | store_direct | add_direct | branch_if_zero_set_direct | literal_byte
+    instructions = (load_direct | store_direct | add_direct | branch_if_zero_set_direct | wait_for_interrupt |
+                    literal_byte)
     label_definition = label << ps.lit(":") > Label
     comment = ps.lit("/*") & ps.reg(r"[a-zA-Z0-9\.,\- \"!\+\(\)]+") & ps.lit("*/")
     instruction = ps.opt(label_definition) & instructions << ps.opt(comment) > flatten
@@ -113,30 +151,32 @@ class Emittable:
 
 
 class Assembler:
+    def __init__(self, optimize=False):
+        # With optimize, the parsed sections go through the peephole optimizer first and report holds what
+        # it changed.
+        self.optimize = optimize
+        self.report = None
+
     def assemble(self, source):
-        result = AssemblerParsers.program.parse(source)
-        match result:
-            case ps.Success(value):
-                sections = value
-            case ps.Failure(error):
-                raise error
-        global_max_address = 0
+        # source is a string or an open text file. Returns an Image with one segment for every run of
+        # sections that touch or overlap.
+        sections = parser.parse(source)
+        if self.optimize:
+            from micro0.assembler.optimizer import optimize  # The optimizer builds on this module.
+            sections, self.report = optimize(sections)
         symbols = {}
         for section in sections:
-            max_address = section.origin
+            address = section.origin
             for instruction in section.instructions:
                 if isinstance(instruction, Label):
-                    symbols[instruction.value] = max_address
-                max_address += instruction.size
-            global_max_address = max(global_max_address, max_address)
-        program = [0] * global_max_address
-        emittables = []
+                    symbols[instruction.value] = address
+                address += instruction.size
+        image = Image.allocate(extents(sections), symbols, sections)
         for section in sections:
+            window = image.window(section.origin)
             address = section.origin
             for instruction in section.instructions:
-                emittables.append(Emittable(address, instruction))
+                instruction.emit(window, symbols, address)
                 address += instruction.size
-        for emittable in emittables:
-            emittable.emit(program, symbols)
 
-        return program
+        return image
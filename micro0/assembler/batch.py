@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from micro0.assembler.assembler import Assembler, VERSION
+from micro0.assembler.image import Image
+
+
+class Cache:
+    # Images on disk, keyed by a hash of the source, the assembler version and the options. Entries are
+    # written to a temporary file and renamed into place, so concurrent workers never see half an entry.
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def key(source, optimize=False):
+        digest = hashlib.sha256(f"micro0 {VERSION} optimize={bool(optimize)}\n".encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + ".json")
+
+    def get(self, key):
+        # Anything that is not a readable, well formed entry is a miss.
+        try:
+            with open(self.path(key)) as file:
+                entry = json.load(file)
+            return Image([(origin, bytes.fromhex(data)) for origin, data in entry["segments"]], entry["symbols"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, key, image):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"segments": [(origin, data.hex()) for origin, data in image.segments], "symbols": image.symbols}
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(entry, file)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+class Result:
+    # image is None and error holds the message if the file did not assemble.
+    def __init__(self, path, image=None, error=None, cached=False, elapsed=0.0):
+        self.path = path
+        self.image = image
+        self.error = error
+        self.cached = cached
+        self.elapsed = elapsed
+
+
+def assemble_file(path, cache_directory=None, optimize=False, sections=False):
+    # Images keep the parsed sections, which a full listing needs, only with sections. Passing them back from
+    # a worker costs more than assembling a small file, and the cache does not store them, so with sections
+    # the cache is written but never read.
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as file:
+            source = file.read()
+        cache = None if cache_directory is None else Cache(cache_directory)
+        key = Cache.key(source, optimize)
+        image = None if cache is None or sections else cache.get(key)
+        if image is not None:
+            return Result(path, image, cached=True, elapsed=time.perf_counter() - start)
+        image = Assembler(optimize).assemble(source.decode())
+        if not sections:
+            image.sections = None
+    except (OSError, ValueError, KeyError) as error:
+        return Result(path, error=f"{type(error).__name__}: {error}", elapsed=time.perf_counter() - start)
+    if cache is not None:
+        # A cache that cannot be written to only costs the next run the time to assemble again.
+        try:
+            cache.put(key, image)
+        except OSError:
+            pass
+    return Result(path, image, elapsed=time.perf_counter() - start)
+
+
+def assemble_files(paths, cache_directory=None, optimize=False, sections=False, max_workers=None):
+    # Assembles every file on a process pool and returns a Result for each, in order. max_workers=1
+    # assembles in this process instead.
+    if max_workers == 1:
+        return [assemble_file(path, cache_directory, optimize, sections) for path in paths]
+    with ProcessPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(assemble_file, path, cache_directory, optimize, sections) for path in paths]
+        return [future.result() for future in futures]
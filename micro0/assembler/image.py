@@ -0,0 +1,147 @@
+import bisect
+
+
+def extents(sections):
+    # The address ranges the sections cover, with overlapping and adjacent ranges merged.
+    merged = []
+    for start, end in sorted((section.origin, section.origin + sum(instruction.size for instruction in
+                                                                 section.instructions)) for section in sections):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        elif end > start:
+            merged.append([start, end])
+    return merged
+
+
+class Window:
+    # Lets instructions emit at absolute addresses into one segment.
+    def __init__(self, origin, data):
+        self.origin = origin
+        self.data = data
+
+    def __setitem__(self, address, value):
+        self.data[address - self.origin] = value
+
+
+class Image:
+    # A sparse program: (origin, bytearray) segments in address order that never overlap or touch, plus the
+    # symbols and, when it came from the assembler, the sections it was assembled from. Memory and System
+    # load the segments directly; bytes(image) is the raw binary from address 0 with the gaps zeroed.
+    def __init__(self, segments=(), symbols=None, sections=None):
+        self.segments = [(origin, bytearray(data)) for origin, data in segments]
+        self.symbols = {} if symbols is None else symbols
+        self.sections = sections
+
+    @classmethod
+    def allocate(cls, extents, symbols=None, sections=None):
+        return cls([(start, bytearray(end - start)) for start, end in extents], symbols, sections)
+
+    def __eq__(self, other):
+        return self.segments == other.segments and self.symbols == other.symbols
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def __bytes__(self):
+        return self.binary()
+
+    def __getitem__(self, address):
+        index = bisect.bisect_right(self.segments, address, key=lambda segment: segment[0]) - 1
+        if index >= 0:
+            origin, data = self.segments[index]
+            if address < origin + len(data):
+                return data[address - origin]
+        return 0
+
+    @property
+    def end(self):
+        return self.segments[-1][0] + len(self.segments[-1][1]) if self.segments else 0
+
+    def window(self, address):
+        # The Window of the segment that holds address.
+        origin, data = self.segments[bisect.bisect_right(self.segments, address, key=lambda segment: segment[0]) - 1]
+        return Window(origin, data)
+
+    def binary(self, start=0, end=None):
+        end = self.end if end is None else end
+        output = bytearray(max(end - start, 0))
+        for origin, data in self.segments:
+            first, last = max(origin, start), min(origin + len(data), end)
+            if first < last:
+                output[first - start:last - start] = data[first - origin:last - origin]
+        return bytes(output)
+
+    def intel_hex(self, record_size=16):
+        lines = []
+        for origin, data in self.segments:
+            for position in range(0, len(data), record_size):
+                lines.append(hex_record(origin + position, 0x00, data[position:position + record_size]))
+        lines.append(hex_record(0, 0x01, b""))
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_intel_hex(cls, text):
+        segments = []
+        for number, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith(":"):
+                raise ValueError(f"Line {number} is not an Intel HEX record")
+            record = bytes.fromhex(line[1:])
+            if len(record) < 5 or len(record) != record[0] + 5 or sum(record) & 0xff:
+                raise ValueError(f"Line {number} has a bad length or checksum")
+            address, kind, data = record[1] << 8 | record[2], record[3], record[4:-1]
+            if kind == 0x01:
+                break
+            if kind != 0x00:
+                raise ValueError(f"Line {number} has unsupported record type {kind:#04x}")
+            if segments and segments[-1][0] + len(segments[-1][1]) == address:
+                segments[-1][1].extend(data)
+            else:
+                segments.append((address, bytearray(data)))
+        image = cls()
+        for origin, data in segments:
+            image.write(origin, data)
+        return image
+
+    def write(self, address, data):
+        # Copies data to address, growing and merging segments as needed.
+        end = address + len(data)
+        first = bisect.bisect_left(self.segments, address, key=lambda segment: segment[0] + len(segment[1]))
+        last = bisect.bisect_right(self.segments, end, key=lambda segment: segment[0])
+        merged = self.segments[first:last]
+        start = min([address] + [origin for origin, _ in merged])
+        output = bytearray(max([end] + [origin + len(existing) for origin, existing in merged]) - start)
+        for origin, existing in merged:
+            output[origin - start:origin - start + len(existing)] = existing
+        output[address - start:end - start] = data
+        self.segments[first:last] = [(start, output)]
+
+    def listing(self):
+        # Every instruction with its address and bytes, followed by the segments and the symbol table.
+        lines = []
+        for section in self.sections or ():
+            lines.append(f"            .org {section.origin:#06x}")
+            address = section.origin
+            for instruction in section.instructions:
+                if instruction.size == 0:
+                    lines.append(f"{address:04x}{'':18}{instruction}")
+                    continue
+                data = " ".join(f"{self[a]:02x}" for a in range(address, address + instruction.size))
+                lines.append(f"{address:04x}  {data:12}    {instruction}")
+                address += instruction.size
+            lines.append("")
+        lines.append("Segments:")
+        for origin, data in self.segments:
+            lines.append(f"    {origin:04x}-{origin + len(data) - 1:04x}  {len(data):5} bytes")
+        lines.append("")
+        lines.append("Symbols:")
+        for name, address in sorted(self.symbols.items(), key=lambda symbol: (symbol[1], symbol[0])):
+            lines.append(f"    {address:04x}  {name}")
+        return "\n".join(lines) + "\n"
+
+
+def hex_record(address, kind, data):
+    record = bytes([len(data), address >> 8 & 0xff, address & 0xff, kind]) + bytes(data)
+    return ":" + (record + bytes([-sum(record) & 0xff])).hex().upper()
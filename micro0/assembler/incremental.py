@@ -0,0 +1,223 @@
+import hashlib
+import os
+import threading
+import time
+
+from micro0.assembler import parser
+from micro0.assembler.assembler import Emittable, Label
+from micro0.assembler.image import Image, extents
+from micro0.emulator.computer import Memory
+
+
+class Chunk:
+    # The sections parsed from one run of source lines starting at a .org. Origins are absolute, so the
+    # addresses of everything in a chunk, and the labels it defines, only depend on its own text.
+    def __init__(self, sections):
+        self.sections = sections
+        self.labels = {}
+        self.emittables = []
+        self.references = {}
+        for section in sections:
+            address = section.origin
+            for instruction in section.instructions:
+                if isinstance(instruction, Label):
+                    self.labels[instruction.value] = address
+                elif instruction.size:
+                    emittable = Emittable(address, instruction)
+                    self.emittables.append(emittable)
+                    symbol = getattr(instruction, "address", None)
+                    if isinstance(symbol, str):
+                        self.references.setdefault(symbol, []).append(emittable)
+                address += instruction.size
+        self.by_address = {emittable.address: emittable for emittable in self.emittables}
+        self.position = {emittable: index for index, emittable in enumerate(self.emittables)}
+        self.end = max((emittable.address + emittable.instruction.size for emittable in self.emittables), default=0)
+
+    def covering(self, address):
+        for start in range(address - 2, address + 1):
+            emittable = self.by_address.get(start)
+            if emittable is not None and address < start + emittable.instruction.size:
+                yield emittable
+
+
+def split(lines):
+    # Yields (first line number, text) for every chunk of the source, cutting before each line that starts
+    # with .org. Anything ahead of the first .org belongs to the first chunk.
+    chunk = []
+    start = 1
+    origin = False
+    for number, line in enumerate(lines, 1):
+        if line.lstrip().startswith(".org"):
+            if origin:
+                yield start, "\n".join(chunk).rstrip()
+                chunk = []
+                start = number
+            origin = True
+        chunk.append(line.rstrip("\n"))
+    if chunk:
+        yield start, "\n".join(chunk).rstrip()
+
+
+class IncrementalAssembler:
+    # Produces the same program as Assembler, but remembers the previous source. Chunks are cached by the
+    # hash of their text, so only edited chunks are parsed again, and only the bytes of added or removed
+    # chunks and of instructions that refer to a symbol whose address moved are emitted again.
+    def __init__(self):
+        self.cache = {}
+        self.chunks = []
+        self.symbols = {}
+        self.program = bytearray()
+        self.parsed = 0
+
+    def _chunk(self, start, text):
+        key = hashlib.sha256(text.encode()).digest()
+        chunk = self.cache.get(key)
+        if chunk is None:
+            try:
+                chunk = Chunk(parser.parse(text))
+            except parser.ParseError as error:
+                raise parser.ParseError(error.message, error.line + start - 1, error.column) from None
+            self.cache[key] = chunk
+            self.parsed += 1
+        return chunk
+
+    def update(self, source):
+        # source is a string or an open text file. Returns the bytes that changed as {address: value}; bytes
+        # that are no longer part of the program are reported as 0.
+        self.parsed = 0
+        lines = source.splitlines() if isinstance(source, str) else source
+        chunks = [self._chunk(start, text) for start, text in split(lines)]
+        if not chunks:
+            # Reports the missing .org the same way the parser does.
+            parser.parse("")
+        symbols = {}
+        for chunk in chunks:
+            symbols.update(chunk.labels)
+
+        previous = self.chunks
+        if [chunk for chunk in previous if chunk in chunks] != [chunk for chunk in chunks if chunk in previous]:
+            # Chunks that moved relative to each other may now overlap the other way round.
+            previous = []
+        dirty = set()
+        for chunk in previous:
+            if chunk not in chunks:
+                for emittable in chunk.emittables:
+                    dirty.update(range(emittable.address, emittable.address + emittable.instruction.size))
+        dirty.update(range(len(self.program)) if not previous else ())
+        moved = {symbol for symbol in symbols.keys() | self.symbols.keys()
+                 if symbols.get(symbol) != self.symbols.get(symbol)}
+        for chunk in chunks:
+            if chunk in previous:
+                emittables = [emittable for symbol in moved for emittable in chunk.references.get(symbol, ())]
+            else:
+                emittables = chunk.emittables
+            for emittable in emittables:
+                dirty.update(range(emittable.address, emittable.address + emittable.instruction.size))
+
+        # Emitting an instruction again rewrites all of its bytes, so anything else that overlaps those has to
+        # be emitted again as well, in source order.
+        pending = set(dirty)
+        while pending:
+            found = set()
+            for chunk in chunks:
+                for address in pending:
+                    for emittable in chunk.covering(address):
+                        found.update(range(emittable.address, emittable.address + emittable.instruction.size))
+            pending = found - dirty
+            dirty |= found
+        selected = []
+        for chunk in chunks:
+            emittables = {emittable for address in dirty for emittable in chunk.covering(address)}
+            selected.extend(sorted(emittables, key=chunk.position.__getitem__))
+
+        patch = dict.fromkeys(dirty, 0)
+        for emittable in selected:
+            emittable.emit(patch, symbols)
+
+        program = self.program
+        patch = {address: value for address, value in patch.items()
+                 if value != (program[address] if address < len(program) else 0)}
+        size = max((chunk.end for chunk in chunks), default=0)
+        del program[size:]
+        program.extend(bytes(size - len(program)))
+        for address, value in patch.items():
+            if address < size:
+                program[address] = value
+        self.chunks = chunks
+        self.symbols = symbols
+        return patch
+
+    def assemble(self, source):
+        # The same Image as Assembler would return, cut from program.
+        self.update(source)
+        sections = [section for chunk in self.chunks for section in chunk.sections]
+        return Image([(start, self.program[start:end]) for start, end in extents(sections)], dict(self.symbols),
+                     sections)
+
+
+class Watcher:
+    # Reassembles a source file whenever it changes and writes the changed bytes to target, which is anything
+    # with write(address, value). Given a System, writes go through its bus, so translated code that
+    # covers a patched address is dropped. poll() is meant to be called between runs of the machine;
+    # run() polls on its own thread until stop() is called, for targets that are safe to write to while
+    # they run, such as a Memory that no translating cpu is using.
+    def __init__(self, path, target, assembler=None, interval=0.2, sleep=time.sleep):
+        self.path = path
+        self.target = getattr(target, "bus", target)
+        self.assembler = IncrementalAssembler() if assembler is None else assembler
+        self.interval = interval
+        self.sleep = sleep
+        self.stamp = None
+        self.error = None
+        self.loaded = False
+        self.stopped = threading.Event()
+
+    def poll(self):
+        # Returns the bytes that were written, or None if the file did not change. The first program that
+        # assembles is written out segment by segment, leaving the gaps between them alone. Bytes that are no
+        # longer part of the program are only cleared where the target maps them to memory, so devices never
+        # see those writes. A file that does not assemble is left alone until it changes again; the error is
+        # kept in error. A missing file counts as unchanged, as editors that save by renaming a new file over
+        # the old one briefly leave none.
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (status.st_mtime_ns, status.st_size)
+        if stamp == self.stamp:
+            return None
+        self.stamp = stamp
+        try:
+            with open(self.path) as file:
+                patch = self.assembler.update(file)
+        except FileNotFoundError:
+            self.stamp = None
+            return None
+        except (parser.ParseError, KeyError) as error:
+            self.error = error
+            return None
+        self.error = None
+        program = self.assembler.program
+        segments = extents([section for chunk in self.assembler.chunks for section in chunk.sections])
+        if not self.loaded:
+            patch = {address: program[address] for start, end in segments for address in range(start, end)}
+            self.loaded = True
+        else:
+            patch = {address: value for address, value in patch.items()
+                     if self._memory(address) or any(start <= address < end for start, end in segments)}
+        for address in sorted(patch):
+            self.target.write(address, patch[address])
+        return patch
+
+    def _memory(self, address):
+        device = getattr(self.target, "device", None)
+        return device is None or isinstance(device(address), Memory)
+
+    def run(self):
+        self.stopped.clear()
+        while not self.stopped.is_set():
+            self.poll()
+            self.sleep(self.interval)
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,270 @@
+from micro0.assembler.assembler import Section, DirectInstruction, LoadDirect, StoreDirect, AddDirect, \
+    BranchIfZeroSet, WaitForInterrupt, LiteralByte, Label
+from micro0.emulator.computer import CYCLES, DEVICES
+
+# What is known about acc before an instruction: the memory locations that hold the same value, its value if
+# that is known, and whether it is known not to be zero. None stands for an instruction no path reaches.
+UNKNOWN = (frozenset(), None, False)
+
+
+def meet(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return left[0] & right[0], left[1] if left[1] == right[1] else None, left[2] and right[2]
+
+
+class Change:
+    # after is None for an instruction that was removed. cycles is what every execution of the instruction
+    # saves, for a branch only when it is taken.
+    def __init__(self, address, before, after, cycles):
+        self.address = address
+        self.before = before
+        self.after = after
+        self.cycles = cycles
+
+    def __repr__(self):
+        after = "removed" if self.after is None else str(self.after)
+        return f"Change({self.address:#06x}: {self.before} -> {after}, {self.cycles} cycles)"
+
+
+class Report:
+    def __init__(self, changes=()):
+        self.changes = list(changes)
+
+    @property
+    def cycles(self):
+        return sum(change.cycles for change in self.changes)
+
+    @property
+    def size(self):
+        return sum(change.before.size for change in self.changes if change.after is None)
+
+
+class Optimizer:
+    # A peephole pass over parsed sections. A dataflow analysis from every section origin and branch target
+    # tracks what acc holds, which lets it drop loads of values acc already holds, stores of values memory
+    # already holds, adds of a constant zero and branches that are never taken or go to the next instruction.
+    # Taken branches to another branch go straight to its target instead. Numeric addresses that point into
+    # a section that shrank are moved along with what they point to.
+    #
+    # Instructions whose bytes the program stores to or reads are never changed, and an instruction with a
+    # patched operand is assumed to access anything. Programs that patch an opcode or a branch target are
+    # left alone, as are sections that overlap. Constant data is only trusted while no store has a patched
+    # operand, and computed addresses are assumed to stay within the data they start out pointing at.
+    def __init__(self, sections):
+        self.sections = sections
+        self.symbols = {}
+        self.items = []
+        for index, section in enumerate(sections):
+            address = section.origin
+            for instruction in section.instructions:
+                if isinstance(instruction, Label):
+                    self.symbols[instruction.value] = address
+                self.items.append((index, address, instruction))
+                address += instruction.size
+        self.starts = {}
+        for index, (_, address, _) in enumerate(self.items):
+            self.starts.setdefault(address, index)
+
+    def operand(self, instruction):
+        if not isinstance(instruction, DirectInstruction) or isinstance(instruction, WaitForInterrupt):
+            return None
+        if isinstance(instruction.address, str):
+            return self.symbols.get(instruction.address)
+        return instruction.address
+
+    def _classify(self):
+        # Returns False if the program rewrites its own control flow.
+        stored, accessed = set(), set()
+        for _, _, instruction in self.items:
+            if isinstance(instruction, (LoadDirect, StoreDirect, AddDirect)):
+                accessed.add(self.operand(instruction))
+                if isinstance(instruction, StoreDirect):
+                    stored.add(self.operand(instruction))
+        self.patched, self.pinned = set(), set()
+        for index, (_, address, instruction) in enumerate(self.items):
+            if isinstance(instruction, DirectInstruction):
+                if address in stored:
+                    return False
+                if any(a in stored for a in range(address + 1, address + 3)):
+                    if isinstance(instruction, BranchIfZeroSet):
+                        return False
+                    self.patched.add(index)
+                if any(a in accessed for a in range(address, address + 3)):
+                    self.pinned.add(index)
+        self.constants = {}
+        if not any(isinstance(self.items[index][2], StoreDirect) for index in self.patched):
+            self.constants = {address: instruction.value for _, address, instruction in self.items
+                              if isinstance(instruction, LiteralByte) and address not in stored and address < DEVICES}
+        return True
+
+    def _following(self, index):
+        if index + 1 < len(self.items) and self.items[index + 1][0] == self.items[index][0]:
+            return index + 1
+        return None
+
+    def _transfer(self, index, state):
+        # Returns (successor, state) for every way out of the instruction.
+        known, constant, nonzero = state
+        _, address, instruction = self.items[index]
+        following = self._following(index)
+        location = self.operand(instruction)
+        untracked = index in self.patched or location is None or location >= DEVICES
+        if isinstance(instruction, LiteralByte):
+            return []
+        if isinstance(instruction, BranchIfZeroSet):
+            successors = []
+            target = self.starts.get(location)
+            if target is not None and not nonzero:
+                successors.append((target, (known, 0, False)))
+            if constant != 0 and following is not None:
+                successors.append((following, (known, constant, True)))
+            return successors
+        if isinstance(instruction, LoadDirect):
+            value = self.constants.get(location)
+            if untracked:
+                state = UNKNOWN
+            elif location in known or value is not None and value == constant:
+                state = known | {location}, constant, nonzero
+            else:
+                state = frozenset([location]), value, value is not None and value != 0
+        elif isinstance(instruction, StoreDirect):
+            if index in self.patched or location is None:
+                state = frozenset(), constant, nonzero
+            elif location < DEVICES:
+                state = known | {location}, constant, nonzero
+        elif isinstance(instruction, AddDirect):
+            value = self.constants.get(location)
+            if untracked:
+                state = UNKNOWN
+            elif value != 0:
+                constant = None if constant is None or value is None else (constant + value) & 0xff
+                state = frozenset(), constant, constant is not None and constant != 0
+        return [] if following is None else [(following, state)]
+
+    def _analyse(self):
+        states = [None] * len(self.items)
+        pending = []
+        entries = [index for index, (section, _, instruction) in enumerate(self.items)
+                   if index == 0 or self.items[index - 1][0] != section or
+                   isinstance(self.items[index - 1][2], LiteralByte)]
+        for index in entries:
+            states[index] = UNKNOWN
+            pending.append(index)
+        while pending:
+            index = pending.pop()
+            for successor, state in self._transfer(index, states[index]):
+                merged = meet(states[successor], state)
+                if merged != states[successor]:
+                    states[successor] = merged
+                    pending.append(successor)
+        return states
+
+    def _chain(self, index):
+        # Follows a taken branch through branches at its target. Returns the last operand and the hop count.
+        instruction = self.items[index][2]
+        operand, target, hops, seen = instruction.address, self.operand(instruction), 0, {index}
+        while target in self.starts:
+            hop = self.starts[target]
+            while isinstance(self.items[hop][2], Label):
+                hop += 1
+            next_instruction = self.items[hop][2]
+            # A branch to the next instruction is removed, so going through it costs nothing.
+            if not isinstance(next_instruction, BranchIfZeroSet) or hop in seen or hop in self.patched or \
+                    self.operand(next_instruction) in (target, self.items[hop][1] + next_instruction.size):
+                break
+            operand, target, hops = next_instruction.address, self.operand(next_instruction), hops + 1
+            seen.add(hop)
+        return operand, hops
+
+    def _decide(self, index, state):
+        # Returns the replacement for an instruction, None to remove it, or the instruction itself.
+        _, address, instruction = self.items[index]
+        if state is None or index in self.pinned or not isinstance(instruction, DirectInstruction):
+            return instruction
+        known, constant, nonzero = state
+        location = self.operand(instruction)
+        if location is None or location >= DEVICES:
+            return instruction
+        if isinstance(instruction, LoadDirect):
+            if location in known or constant is not None and self.constants.get(location) == constant:
+                return None
+        elif isinstance(instruction, StoreDirect):
+            if location in known:
+                return None
+        elif isinstance(instruction, AddDirect):
+            if self.constants.get(location) == 0:
+                return None
+        elif isinstance(instruction, BranchIfZeroSet):
+            if nonzero or location == address + instruction.size:
+                return None
+            operand, hops = self._chain(index)
+            if hops:
+                return BranchIfZeroSet(operand)
+        return instruction
+
+    def _moved(self, decided, ends):
+        # Where every old address ends up. The bytes of a removed instruction move to whatever follows it.
+        moved = {}
+        positions = [section.origin for section in self.sections]
+        for index, (section, address, instruction) in enumerate(self.items):
+            kept = decided[index] is not None
+            for offset in range(instruction.size):
+                moved[address + offset] = positions[section] + offset * kept
+            positions[section] += instruction.size * kept
+        for section, end in enumerate(ends):
+            moved.setdefault(end, positions[section])
+        return moved
+
+    def run(self):
+        # Returns the optimized sections and a Report.
+        ends = [section.origin + sum(instruction.size for instruction in section.instructions)
+                for section in self.sections]
+        ranges = sorted(zip((section.origin for section in self.sections), ends))
+        if any(start < end for (_, end), (start, _) in zip(ranges, ranges[1:])) or not self._classify():
+            return self.sections, Report()
+        states = self._analyse()
+        proposed = [self._decide(index, state) for index, state in enumerate(states)]
+        # A section that another one starts right after might fall through into it, so it keeps its size. So
+        # does a section that a pinned instruction points into, as the program reads the operand as data.
+        origins = {section.origin for section in self.sections}
+        fixed = {section for section, end in enumerate(ends) if end in origins}
+        while True:
+            decided = [instruction if replacement is None and section in fixed else replacement
+                       for (section, _, instruction), replacement in zip(self.items, proposed)]
+            moved = self._moved(decided, ends)
+            shifted = set()
+            for index in self.pinned:
+                operand = self.operand(self.items[index][2])
+                if operand is not None and moved.get(operand, operand) != operand:
+                    shifted.update(section for section, end in enumerate(ends)
+                                   if self.sections[section].origin <= operand <= end)
+            if shifted <= fixed:
+                break
+            fixed |= shifted
+
+        changes = []
+        for index, (section, address, instruction) in enumerate(self.items):
+            if decided[index] is None:
+                changes.append(Change(address, instruction, None, CYCLES[instruction.opcode]))
+            elif decided[index] is not instruction:
+                cycles = self._chain(index)[1] * CYCLES[instruction.opcode]
+                changes.append(Change(address, instruction, decided[index], cycles))
+
+        sections = [Section(section.origin, []) for section in self.sections]
+        for index, (section, _, _) in enumerate(self.items):
+            instruction = decided[index]
+            if instruction is None:
+                continue
+            operand = getattr(instruction, "address", None)
+            if isinstance(operand, int) and not isinstance(instruction, WaitForInterrupt) and \
+                    moved.get(operand, operand) != operand:
+                instruction = type(instruction)(moved[operand])
+            sections[section].instructions.append(instruction)
+        return sections, Report(changes)
+
+
+def optimize(sections):
+    return Optimizer(sections).run()
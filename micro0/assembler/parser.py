@@ -0,0 +1,107 @@
+import re
+
+from micro0.assembler import assembler
+
+TOKEN = re.compile(r"\s*(?:(?P<hexadecimal>0x[0-9a-fA-F]+)|(?P<word>[a-z]+)|(?P<origin>\.org)"
+                   r"|(?P<comment>/\*.*?\*/)|(?P<punctuation>[\[\]:])|(?P<invalid>\S))")
+
+
+class ParseError(ValueError):
+    def __init__(self, message, line, column):
+        super().__init__(f"line {line}, column {column}: {message}")
+        self.message = message
+        self.line = line
+        self.column = column
+
+
+def tokens(lines):
+    # Yields (kind, value, line, column) for every token, with lines and columns counted from 1, and finally
+    # an end token just past the last line.
+    number, text = 1, ""
+    for number, text in enumerate(lines, 1):
+        for match in TOKEN.finditer(text.rstrip("\n")):
+            kind = match.lastgroup
+            if kind is None:
+                break
+            if kind == "comment":
+                continue
+            value = match.group(kind)
+            column = match.start(kind) + 1
+            if kind == "invalid":
+                if value == "/" and text.startswith("/*", column - 1):
+                    raise ParseError("comment is not closed on the same line", number, column)
+                raise ParseError(f"unexpected {value!r}", number, column)
+            yield kind, value, number, column
+    yield "end", None, number, len(text.rstrip("\n")) + 1
+
+
+class Parser:
+    # Reads the same language as AssemblerParsers in a single pass over the source, one line at a time, and
+    # produces the same Section, Instruction and Label objects. It is a little more lenient: comments may
+    # appear anywhere on a line, and tabs count as whitespace.
+    def __init__(self, lines):
+        self.direct = {"load": assembler.LoadDirect, "store": assembler.StoreDirect, "add": assembler.AddDirect,
+                       "brz": assembler.BranchIfZeroSet}
+        self.tokens = tokens(lines)
+        self.token = next(self.tokens)
+
+    def _advance(self):
+        token = self.token
+        self.token = next(self.tokens, token)
+        return token
+
+    def _expect(self, kind, value=None, description=None):
+        token = self.token
+        if token[0] != kind or value is not None and token[1] != value:
+            self._error(f"expected {description or value or kind}")
+        return self._advance()
+
+    def _error(self, message):
+        kind, value, line, column = self.token
+        found = "end of input" if kind == "end" else repr(value)
+        raise ParseError(f"{message}, found {found}", line, column)
+
+    def _number(self):
+        return int(self._expect("hexadecimal", description="a hexadecimal number")[1], 16)
+
+    def sections(self):
+        # Yields every section once it is complete.
+        if self.token[0] != "origin":
+            self._error("expected .org")
+        while self.token[0] != "end":
+            self._advance()
+            section = assembler.Section(self._number(), [])
+            labels = 0
+            while self.token[0] not in ("origin", "end"):
+                if self.token[0] != "word":
+                    self._error("expected an instruction or label")
+                kind, word, line, column = self._advance()
+                if self.token[0] == "punctuation" and self.token[1] == ":":
+                    self._advance()
+                    section.instructions.append(assembler.Label(word))
+                    labels += 1
+                    continue
+                if word in self.direct:
+                    self._expect("punctuation", "[", "'['")
+                    if self.token[0] == "hexadecimal":
+                        address = self._number()
+                    else:
+                        address = self._expect("word", description="an address or label")[1]
+                    self._expect("punctuation", "]", "']'")
+                    section.instructions.append(self.direct[word](address))
+                elif word == "db":
+                    section.instructions.append(assembler.LiteralByte(self._number()))
+                elif word == "wait":
+                    section.instructions.append(assembler.WaitForInterrupt())
+                else:
+                    raise ParseError(f"unknown instruction {word!r}", line, column)
+                labels = 0
+            if labels or len(section.instructions) == 0:
+                self._error("expected an instruction")
+            yield section
+
+
+def parse(source):
+    # source is a string or anything that yields lines, such as an open text file.
+    lines = source.splitlines() if isinstance(source, str) else source
+    return list(Parser(lines).sections())
@@ -35,7 +35,7 @@ class TestAssembler(unittest.TestCase):
         """
         assembler = Assembler()
         prog = assembler.assemble(source)
-        self.assertEqual([0x01, 0x03, 0x00, 0x32], prog)
+        self.assertEqual(bytes([0x01, 0x03, 0x00, 0x32]), bytes(prog))
 
     def test_move_with_label(self):
         source = """
@@ -49,7 +49,7 @@ class TestAssembler(unittest.TestCase):
         """
         assembler = Assembler()
         prog = assembler.assemble(source)
-        self.assertEqual([0x01, 0x06, 0x00, 0x02, 0x07, 0x00, 0x32, 0x00], prog)
+        self.assertEqual(bytes([0x01, 0x06, 0x00, 0x02, 0x07, 0x00, 0x32, 0x00]), bytes(prog))
 
     def test_loop_with_label(self):
         source = """
@@ -64,7 +64,7 @@ class TestAssembler(unittest.TestCase):
         """
         assembler = Assembler()
         prog = assembler.assemble(source)
-        self.assertEqual([0x01, 0x09, 0x00, 0x02, 0x0a, 0x00, 0x04, 0x00, 0x00, 0x32, 0x00], prog)
+        self.assertEqual(bytes([0x01, 0x09, 0x00, 0x02, 0x0a, 0x00, 0x04, 0x00, 0x00, 0x32, 0x00]), bytes(prog))
 
     def test_add(self):
         source = """
@@ -78,7 +78,16 @@ class TestAssembler(unittest.TestCase):
         """
         assembler = Assembler()
         prog = assembler.assemble(source)
-        self.assertEqual([0x01, 0x09, 0x00, 0x03, 0x0a, 0x00, 0x04, 0x00, 0x00, 0x32, 0x00], prog)
+        self.assertEqual(bytes([0x01, 0x09, 0x00, 0x03, 0x0a, 0x00, 0x04, 0x00, 0x00, 0x32, 0x00]), bytes(prog))
+
+    def test_wait(self):
+        source = """
+                .org 0x0
+        idle:   wait
+                brz [idle]
+        """
+        prog = Assembler().assemble(source)
+        self.assertEqual(bytes([0x05, 0x00, 0x00, 0x04, 0x00, 0x00]), bytes(prog))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from micro0.assembler import __main__ as cli
+from micro0.assembler.assembler import Assembler
+from micro0.assembler.batch import Cache, assemble_files
+
+SOURCE = """
+            .org 0x0
+loop:       load [value]
+            store [0xf000]
+            brz [loop]
+
+            .org 0x1000
+value:      db 0x2a
+"""
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.directory.name, "cache")
+        self.paths = []
+        for index, source in enumerate((SOURCE, SOURCE.replace("0x2a", "0x2b"), ".org 0x0\nload [Value]")):
+            path = os.path.join(self.directory.name, f"program{index}.asm")
+            with open(path, "w") as file:
+                file.write(source)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache(self):
+        cold = assemble_files(self.paths, self.cache, max_workers=1)
+        self.assertEqual([False, False, False], [result.cached for result in cold])
+        warm = assemble_files(self.paths, self.cache, max_workers=1)
+        self.assertEqual([True, True, False], [result.cached for result in warm])
+        self.assertEqual(Assembler().assemble(SOURCE), warm[0].image)
+        self.assertEqual(bytes(cold[1].image), bytes(warm[1].image))
+        self.assertIn("line 2, column 7", warm[2].error)
+        self.assertIsNone(warm[2].image)
+        listed = assemble_files(self.paths[:1], self.cache, sections=True, max_workers=1)[0]
+        self.assertFalse(listed.cached)
+        self.assertIn("load [value]", listed.image.listing())
+
+    def test_key(self):
+        source = SOURCE.encode()
+        self.assertEqual(Cache.key(source), Cache.key(source))
+        self.assertNotEqual(Cache.key(source), Cache.key(source, optimize=True))
+        self.assertNotEqual(Cache.key(source), Cache.key(source + b"\n"))
+
+    def test_corrupt_entry(self):
+        assemble_files(self.paths[:1], self.cache, max_workers=1)
+        cache = Cache(self.cache)
+        with open(self.paths[0], "rb") as file:
+            key = Cache.key(file.read())
+        path = cache.path(key)
+        for text in ("{", "{}", "[]", '{"segments": [[0, 1]], "symbols": {}}'):
+            with open(path, "w") as file:
+                file.write(text)
+            self.assertIsNone(cache.get(key))
+        result = assemble_files(self.paths[:1], self.cache, max_workers=1)[0]
+        self.assertFalse(result.cached)
+        self.assertEqual(Assembler().assemble(SOURCE), result.image)
+
+    def test_unwritable_cache(self):
+        with open(self.cache, "w") as file:
+            file.write("not a directory")
+        result = assemble_files(self.paths[:1], self.cache, max_workers=1)[0]
+        self.assertIsNone(result.error)
+        self.assertEqual(Assembler().assemble(SOURCE), result.image)
+
+    def test_parallel(self):
+        serial = assemble_files(self.paths, max_workers=1)
+        parallel = assemble_files(self.paths, self.cache, max_workers=2)
+        self.assertEqual([result.path for result in serial], [result.path for result in parallel])
+        self.assertEqual([result.image for result in serial[:2]], [result.image for result in parallel[:2]])
+
+    def test_cli(self):
+        output = os.path.join(self.directory.name, "output")
+        arguments = ["--cache", self.cache, "--jobs", "1", "--output-dir", output, "--format", "bin", "--format", "hex"]
+        self.assertEqual(1, cli.main(arguments + self.paths))
+        self.assertEqual(0, cli.main(arguments + self.paths[:2]))
+        with open(os.path.join(output, "program0.bin"), "rb") as file:
+            self.assertEqual(bytes(Assembler().assemble(SOURCE)), file.read())
+        self.assertTrue(os.path.exists(os.path.join(output, "program1.hex")))
+        self.assertFalse(os.path.exists(os.path.join(output, "program2.bin")))
+
+
+if __name__ == '__main__':
+    unittest.main()
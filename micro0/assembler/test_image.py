@@ -0,0 +1,79 @@
+import unittest
+
+from micro0.assembler.assembler import Assembler
+from micro0.assembler.image import Image
+from micro0.assembler.incremental import IncrementalAssembler
+from micro0.emulator.computer import Memory, System
+
+SOURCE = """
+            .org 0x0
+loop:       load [value]
+            store [0xf000]
+            brz [loop]
+            .org 0x0009
+            wait
+
+            .org 0xf100
+value:      db 0x2a
+"""
+
+
+class TestImage(unittest.TestCase):
+    def test_segments(self):
+        image = Assembler().assemble(SOURCE)
+        self.assertEqual([(0x0000, bytearray([0x01, 0x00, 0xf1, 0x02, 0x00, 0xf0, 0x04, 0x00, 0x00,
+                                              0x05, 0x00, 0x00])),
+                          (0xf100, bytearray([0x2a]))], image.segments)
+        self.assertEqual({"loop": 0x0000, "value": 0xf100}, image.symbols)
+        self.assertEqual(0xf101, image.end)
+        self.assertEqual((0x01, 0x2a, 0x00), (image[0x0000], image[0xf100], image[0x8000]))
+
+    def test_binary(self):
+        image = Assembler().assemble(SOURCE)
+        binary = bytes(image)
+        self.assertEqual(0xf101, len(binary))
+        self.assertEqual(bytes(image.segments[0][1]), binary[:12])
+        self.assertEqual(0x2a, binary[0xf100])
+        self.assertFalse(any(binary[12:0xf100]))
+        self.assertEqual(b"\x00\x2a", image.binary(0xf0ff, 0xf101))
+
+    def test_intel_hex(self):
+        image = Image([(0x0100, bytes(range(0x14)))])
+        self.assertEqual(":10010000000102030405060708090A0B0C0D0E0F77\n"
+                         ":0401100010111213A5\n"
+                         ":00000001FF\n", image.intel_hex())
+        image = Assembler().assemble(SOURCE)
+        self.assertEqual(image.segments, Image.from_intel_hex(image.intel_hex()).segments)
+        with self.assertRaises(ValueError):
+            Image.from_intel_hex(":0100000001FF\n")
+
+    def test_write(self):
+        image = Image([(0x10, b"\x01\x02"), (0x20, b"\x03")])
+        image.write(0x12, b"\x04" * 0x0e)
+        self.assertEqual([(0x10, bytearray(b"\x01\x02" + b"\x04" * 0x0e + b"\x03"))], image.segments)
+
+    def test_listing(self):
+        listing = Assembler().assemble(SOURCE).listing()
+        self.assertIn("0000                  loop:", listing)
+        self.assertIn("0000  01 00 f1        load [value]", listing)
+        self.assertIn("0009  05 00 00        wait", listing)
+        self.assertIn("f100  2a              db 0x2a", listing)
+        self.assertIn("    0000-000b     12 bytes", listing)
+        self.assertIn("    f100  value", listing)
+
+    def test_load(self):
+        image = Assembler().assemble(SOURCE)
+        memory = Memory(0x0000)
+        memory.write(0x0100, 0xff)
+        memory.load(image)
+        self.assertEqual((0x01, 0x2a, 0xff), (memory.read(0x0000), memory.read(0xf100), memory.read(0x0100)))
+        system = System()
+        system.load(image)
+        self.assertEqual(bytes(image), bytes(system.memory.view(0x0000, 0xf101)))
+
+    def test_incremental(self):
+        self.assertEqual(Assembler().assemble(SOURCE), IncrementalAssembler().assemble(SOURCE))
+
+
+if __name__ == '__main__':
+    unittest.main()
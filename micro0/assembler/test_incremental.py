@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from micro0.assembler.assembler import Assembler
+from micro0.assembler.incremental import IncrementalAssembler, Watcher
+from micro0.assembler.parser import ParseError
+from micro0.emulator.computer import System
+
+SOURCE = """
+            .org 0x0
+loop:       load [value]
+            store [0xf000]
+            load [zero]
+            brz [loop]
+
+            .org 0x1000
+value:      db 0x2a
+zero:       db 0x00
+
+            .org 0x2000
+other:      load [zero]
+"""
+
+
+class TestIncrementalAssembler(unittest.TestCase):
+    def test_matches_assembler(self):
+        assembler = IncrementalAssembler()
+        self.assertEqual(Assembler().assemble(SOURCE), assembler.assemble(SOURCE))
+        self.assertEqual(3, assembler.parsed)
+
+    def test_unchanged(self):
+        assembler = IncrementalAssembler()
+        assembler.update(SOURCE)
+        self.assertEqual({}, assembler.update(SOURCE))
+        self.assertEqual(0, assembler.parsed)
+
+    def test_edit_one_section(self):
+        assembler = IncrementalAssembler()
+        assembler.update(SOURCE)
+        source = SOURCE.replace("value:      db 0x2a", "            db 0x01\nvalue:      db 0x2b")
+        patch = assembler.update(source)
+        self.assertEqual(1, assembler.parsed)
+        self.assertEqual(bytes(Assembler().assemble(source)), assembler.program)
+        # value and zero moved up by one: the bytes of the data section and the operands that refer to them.
+        self.assertEqual({0x1000: 0x01, 0x1001: 0x2b, 0x0001: 0x01, 0x0007: 0x02, 0x2001: 0x02}, patch)
+
+    def test_removed_section(self):
+        assembler = IncrementalAssembler()
+        assembler.update(SOURCE)
+        source = SOURCE.replace(".org 0x2000\nother:      load [zero]", "")
+        patch = assembler.update(source)
+        self.assertEqual({0x2000: 0, 0x2001: 0, 0x2002: 0}, patch)
+        self.assertEqual(bytes(Assembler().assemble(source)), assembler.program)
+
+    def test_error_line(self):
+        assembler = IncrementalAssembler()
+        with self.assertRaises(ParseError) as context:
+            assembler.update(SOURCE.replace("db 0x00", "db 0x0g"))
+        self.assertEqual((10, 19), (context.exception.line, context.exception.column))
+
+
+class TestWatcher(unittest.TestCase):
+    def write(self, path, source):
+        with open(path, "w") as file:
+            file.write(source)
+
+    def test_patches_running_system(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "program.asm")
+            self.write(path, SOURCE)
+            system = System()
+            watcher = Watcher(path, system)
+            self.assertEqual(17, len(watcher.poll()))
+            self.assertIsNone(watcher.poll())
+            system.run(16)
+            self.assertEqual([0x2a], system.char_out.buffer)
+            self.write(path, SOURCE.replace("db 0x2a", "db 0x2b /* edited */"))
+            self.assertEqual({0x1000: 0x2b}, watcher.poll())
+            system.run(16)
+            self.assertEqual([0x2a, 0x2b], system.char_out.buffer)
+            self.write(path, SOURCE.replace("db 0x2a", "db 0x2b\nbroken"))
+            self.assertIsNone(watcher.poll())
+            self.assertIsInstance(watcher.error, ParseError)
+
+    def test_atomic_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "program.asm")
+            self.write(path, SOURCE)
+            system = System()
+            edited = SOURCE.replace("db 0x2a", "db 0x2b /* edited */")
+            steps = [lambda: os.unlink(path), lambda: self.write(path, edited), lambda: watcher.stop()]
+            watcher = Watcher(path, system, sleep=lambda interval: steps.pop(0)())
+            watcher.run()
+            self.assertEqual([], steps)
+            self.assertEqual(0x2b, system.memory.read(0x1000))
+            self.assertIsNone(watcher.poll())
+
+    def test_writes_segments_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "program.asm")
+            device = "\n            .org 0xf000\n            db 0x41\n"
+            self.write(path, SOURCE + device)
+            system = System()
+            system.memory.write(0x0800, 0x99)
+            watcher = Watcher(path, system)
+            self.assertEqual(18, len(watcher.poll()))
+            self.assertEqual(0x99, system.memory.read(0x0800))
+            self.assertEqual([0x41], system.char_out.buffer)
+            self.write(path, SOURCE.replace(".org 0x2000\nother:      load [zero]", ""))
+            self.assertEqual({0x2000: 0, 0x2001: 0, 0x2002: 0}, watcher.poll())
+            self.assertEqual([0x41], system.char_out.buffer)
@@ -0,0 +1,98 @@
+import unittest
+
+from micro0.assembler import parser
+from micro0.assembler.assembler import Assembler
+from micro0.assembler.optimizer import optimize
+from micro0.emulator.computer import System
+
+PROGRAM = """
+            .org 0x0
+            load [count]
+            add [one]
+            store [count]
+            load [count]        /* acc already holds count */
+            store [0xf000]
+            store [count]       /* and so does count */
+            add [zero]
+            brz [done]
+            load [zero]
+            brz [skip]
+skip:       load [zero]         /* acc is zero on both ways in */
+            brz [jump]
+            store [0xf000]
+jump:       brz [done]
+            store [0xf000]
+done:       brz [done]
+
+            .org 0x1000
+count:      db 0x41
+one:        db 0x01
+zero:       db 0x00
+"""
+
+# The load at patch has its operand rewritten, and the first store refers to its low byte by number.
+SELF_MODIFYING = """
+            .org 0x0
+            load [zero]
+            load [zero]
+next:       load [low]
+            store [0x000d]
+patch:      load [0x1000]
+            store [0xf000]
+            load [low]
+            add [one]
+            store [low]
+            load [zero]
+            brz [next]
+
+            .org 0x1000
+string:     db 0x48
+            db 0x69
+            db 0x00
+zero:       db 0x00
+one:        db 0x01
+low:        db 0x00
+"""
+
+
+def run(image, cycles):
+    system = System(False)
+    system.load(image)
+    executed = system.run(cycles, stop_on_halt=True)
+    return bytes(system.char_out.buffer), executed
+
+
+class TestOptimizer(unittest.TestCase):
+    def test_idioms(self):
+        sections, report = optimize(parser.parse(PROGRAM))
+        self.assertEqual(["load [zero]", "skip:", "brz [done]", "store [0xf000]", "jump:", "brz [done]",
+                          "store [0xf000]", "done:", "brz [done]"],
+                         [str(instruction) for instruction in sections[0].instructions[-9:]])
+        self.assertEqual([0x0009, 0x000f, 0x0012, 0x001b, 0x001e, 0x0021],
+                         [change.address for change in report.changes])
+        self.assertEqual(5 + 5 + 6 + 5 + 5 + 5, report.cycles)
+        self.assertEqual(15, report.size)
+
+    def test_cycles_saved(self):
+        assembler = Assembler(optimize=True)
+        output, cycles = run(assembler.assemble(PROGRAM), 10 ** 4)
+        reference_output, reference_cycles = run(Assembler().assemble(PROGRAM), 10 ** 4)
+        self.assertEqual((b"B", reference_cycles - assembler.report.cycles), (output, cycles))
+        self.assertEqual(reference_output, output)
+
+    def test_self_modifying(self):
+        sections, report = optimize(parser.parse(SELF_MODIFYING))
+        self.assertEqual([0x0003], [change.address for change in report.changes])
+        self.assertEqual(["load [zero]", "next:", "load [low]", "store [0x000a]", "patch:", "load [0x1000]"],
+                         [str(instruction) for instruction in sections[0].instructions[:6]])
+        assembler = Assembler(optimize=True)
+        self.assertEqual(b"Hi", run(assembler.assemble(SELF_MODIFYING), 10 ** 4)[0][:2])
+
+    def test_patched_branch(self):
+        sections = parser.parse(".org 0x0\nload [zero]\nload [zero]\nstore [0x0007]\nbrz [0x0000]\n"
+                                ".org 0x1000\nzero: db 0x00")
+        self.assertEqual((sections, []), (optimize(sections)[0], optimize(sections)[1].changes))
+
+
+if __name__ == '__main__':
+    unittest.main()
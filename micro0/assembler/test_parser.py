@@ -0,0 +1,57 @@
+import io
+import unittest
+
+from micro0.assembler.assembler import Section, LoadDirect, AddDirect, StoreDirect, BranchIfZeroSet, LiteralByte, \
+    Label, WaitForInterrupt, AssemblerParsers
+from micro0.assembler.parser import ParseError, parse, tokens
+
+SOURCE = """
+            .org 0x0
+loop:       load [value]    /* Comment */
+            add [0x1234]
+            store [0xf000]
+            wait
+            brz [loop]
+
+            .org 0x1000
+value:      db 0x2a
+"""
+
+
+class TestTokens(unittest.TestCase):
+    def test_tokens(self):
+        self.assertEqual([("word", "load", 1, 3), ("punctuation", "[", 1, 8), ("hexadecimal", "0x12", 1, 9),
+                          ("punctuation", "]", 1, 13), ("end", None, 1, 28)],
+                         list(tokens(["  load [0x12] /* comment */"])))
+
+
+class TestParse(unittest.TestCase):
+    def test_sections(self):
+        self.assertEqual([Section(0, [Label("loop"), LoadDirect("value"), AddDirect(0x1234), StoreDirect(0xf000),
+                                      WaitForInterrupt(), BranchIfZeroSet("loop")]),
+                          Section(0x1000, [Label("value"), LiteralByte(0x2a)])],
+                         parse(SOURCE))
+
+    def test_matches_parsita(self):
+        self.assertEqual(AssemblerParsers.program.parse(SOURCE).unwrap(), parse(SOURCE))
+
+    def test_file(self):
+        self.assertEqual(parse(SOURCE), parse(io.StringIO(SOURCE)))
+
+    def test_mnemonic_as_label(self):
+        self.assertEqual([Section(0, [Label("load"), LoadDirect("load")])], parse(".org 0x0\nload: load [load]"))
+
+    def test_errors(self):
+        for source, line, column in ((".org 0x0\n  load [Value]", 2, 9),
+                                     ("load [0x0]", 1, 1),
+                                     (".org 0x0\n  move [0x0]", 2, 3),
+                                     (".org 0x0\n  load [0x0] /* open", 2, 14),
+                                     (".org 0x0\nend:", 2, 5),
+                                     (".org 0x0\n.org 0x10\ndb 0x0", 2, 1)):
+            with self.assertRaises(ParseError) as context:
+                parse(source)
+            self.assertEqual((line, column), (context.exception.line, context.exception.column))
+
+
+if __name__ == '__main__':
+    unittest.main()
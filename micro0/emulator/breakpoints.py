@@ -0,0 +1,59 @@
+class Stop:
+    BREAKPOINT = "breakpoint"
+    READ = "read"
+    WRITE = "write"
+    OUTPUT = "output"
+    HALTED = "halted"
+    CYCLES = "cycles"
+
+    def __init__(self, reason, cycles, address=None):
+        self.reason = reason
+        self.cycles = cycles
+        self.address = address
+
+    def __eq__(self, other):
+        return (self.reason, self.cycles, self.address) == (other.reason, other.cycles, other.address)
+
+    def __repr__(self):
+        address = "" if self.address is None else f", {self.address:#06x}"
+        return f"Stop({self.reason}, {self.cycles}{address})"
+
+
+class Conditions:
+    # Breakpoints are pc values that stop the cpu before the instruction there executes. Read and write
+    # watchpoints are (start, end) address ranges that stop it right after an instruction accesses them.
+    # An output condition (address, count) stops it once count bytes have been stored to address.
+    def __init__(self, breakpoints=(), reads=(), writes=(), output=None):
+        self.breakpoints = frozenset(breakpoints)
+        self.reads = self._mask(reads)
+        self.writes = self._mask(writes)
+        self.output_address, self.output_count = output if output is not None else (None, 0)
+        self.output_written = 0
+        self.active = bool(self.breakpoints) or bool(reads) or bool(writes) or output is not None
+
+    @staticmethod
+    def _mask(ranges):
+        mask = bytearray(0x10000)
+        for start, end in ranges:
+            mask[start:end] = b"\x01" * (end - start)
+        return mask
+
+    def __bool__(self):
+        return self.active
+
+    def watches(self, instruction, address):
+        if instruction.writes:
+            return address == self.output_address or self.writes[address]
+        return instruction.reads and self.reads[address]
+
+    def hit(self, instruction, address):
+        if instruction.writes:
+            if address == self.output_address:
+                self.output_written += 1
+                if self.output_written >= self.output_count:
+                    return Stop.OUTPUT
+            if self.writes[address]:
+                return Stop.WRITE
+        elif instruction.reads and self.reads[address]:
+            return Stop.READ
+        return None
@@ -1,129 +1,704 @@
+import asyncio
+import collections
+import mmap
+import os
 from typing import List
 
+from micro0.emulator.breakpoints import Conditions, Stop
+from micro0.emulator.display import Display
+from micro0.emulator.events import EventQueue, Timer
+from micro0.emulator.sinks import ListSink
+from micro0.emulator.translator import Translator
+
 
 class Memory:
-    def __init__(self, offset, contents):
+    # Contents are kept as a list of 256 byte pages that start out as slices of one flat backing buffer.
+    # Snapshots share the page objects, and a shared page is copied the first time it is written to.
+    page_size = 0x100
+
+    def __init__(self, offset, contents=b"", size=None):
         self.offset = offset
-        self.contents = contents
+        self.size = 0x10000 - offset if size is None else size
+        self._attach(bytearray(self.size))
+        self.load(contents, offset)
+
+    @classmethod
+    def map_file(cls, path, offset=0x0000, size=None):
+        # A raw image that exactly fills the memory is mapped copy-on-write, so pages that are never
+        # written are never copied. Anything smaller is read straight into a zeroed buffer.
+        memory = cls(offset, size=size)
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == memory.size:
+                memory._attach(mmap.mmap(file.fileno(), memory.size, access=mmap.ACCESS_COPY))
+            else:
+                memory.load_file(file, offset)
+        return memory
+
+    def _attach(self, backing):
+        self.backing = backing
+        self._view = memoryview(backing)
+        self._slices = [self._view[start:start + self.page_size] for start in range(0, self.size, self.page_size)]
+        self.pages = list(self._slices)
+        self.shared = bytearray(len(self.pages))
+        self.relocated = bytearray(len(self.pages))
+
+    def _writable(self, page):
+        if self.shared[page]:
+            self.pages[page] = bytearray(self.pages[page])
+            self.shared[page] = 0
+            self.relocated[page] = 1
+        return self.pages[page]
 
     def read(self, offset):
-        return self.contents[offset]
+        offset -= self.offset
+        return self.pages[offset >> 8][offset & 0xff]
 
     def write(self, offset, value):
-        self.contents[offset] = value
+        offset -= self.offset
+        page = offset >> 8
+        if self.shared[page]:
+            self._writable(page)
+        self.pages[page][offset & 0xff] = value & 0xff
+
+    def read_page(self, start, end):
+        # The bytes from start up to end, which must lie within one page.
+        start -= self.offset
+        low = start & 0xff
+        return self.pages[start >> 8][low:low + end - start - self.offset]
+
+    def load(self, image, address=None):
+        # image is bytes-like, a list of ints or anything with (origin, data) segments, such as an assembler
+        # Image, whose segments are loaded at their own origins.
+        segments = getattr(image, "segments", None)
+        if segments is not None:
+            for origin, data in segments:
+                self.load(data, origin)
+            return
+        start = (self.offset if address is None else address) - self.offset
+        if start < 0 or start + len(image) > self.size:
+            raise ValueError(f"Image of {len(image)} bytes does not fit in memory at {start + self.offset:#06x}")
+        image = memoryview(bytes(image) if isinstance(image, list) else image)
+        position = start
+        while position < start + len(image):
+            page, low = divmod(position, self.page_size)
+            length = min(self.page_size - low, start + len(image) - position)
+            self._writable(page)[low:low + length] = image[position - start:position - start + length]
+            position += length
+
+    def load_file(self, file, address=None):
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "rb") as file:
+                return self.load_file(file, address)
+        start = self.offset if address is None else address
+        if self._contiguous(start, self.offset + self.size):
+            return file.readinto(self.view(start))
+        data = file.read(self.offset + self.size - start)
+        self.load(data, start)
+        return len(data)
+
+    def clear(self):
+        # Pages that never left the backing buffer and that no snapshot holds are zeroed in place.
+        if isinstance(self.backing, bytearray) and not any(self.shared) and not any(self.relocated):
+            self.backing[:] = bytes(self.size)
+        else:
+            self._attach(bytearray(self.size))
+
+    def _contiguous(self, start, end):
+        first = (start - self.offset) >> 8
+        last = (end - self.offset + self.page_size - 1) >> 8
+        return not any(self.shared[first:last]) and not any(self.relocated[first:last])
+
+    def view(self, start=None, end=None):
+        # A live view into memory while the range has not diverged from the backing buffer, otherwise a copy.
+        # The live view is read-only while a snapshot shares any of its pages, as writing through it would
+        # bypass the copy-on-write.
+        start = self.offset if start is None else start
+        end = self.offset + self.size if end is None else end
+        first, last = (start - self.offset) >> 8, (end - self.offset + self.page_size - 1) >> 8
+        if not any(self.relocated[first:last]):
+            view = memoryview(self.backing)[start - self.offset:end - self.offset]
+            return view.toreadonly() if any(self.shared[first:last]) else view
+        return memoryview(b"".join(bytes(page) for page in self.pages))[start - self.offset:end - self.offset]
+
+    @classmethod
+    def from_snapshot(cls, offset, state):
+        # A memory that starts out sharing every page with a snapshot, without a backing buffer of its own.
+        memory = cls(offset, size=0)
+        memory.size = len(state) * cls.page_size
+        memory.restore(state)
+        return memory
+
+    def close(self):
+        # Unmaps a file mapped by map_file. Pages still viewing the mapping, including those shared with
+        # snapshots and forks, are released, and the memory cannot be used afterwards.
+        if isinstance(self.backing, mmap.mmap):
+            for page in self._slices:
+                page.release()
+            self._view.release()
+            self.backing.close()
+
+    def snapshot(self):
+        self.shared[:] = b"\x01" * len(self.pages)
+        return list(self.pages)
+
+    def restore(self, state):
+        self.pages = list(state)
+        self.shared[:] = b"\x01" * len(self.pages)
+        self.relocated[:] = b"\x01" * len(self.pages)
 
 
 class CharacterOutput:
-    def __init__(self, offset):
+    def __init__(self, offset, sink=None):
         self.offset = offset
-        self.buffer = []
+        self.sink = ListSink() if sink is None else sink
+
+    @property
+    def buffer(self):
+        # The output list of a ListSink; other sinks keep their output elsewhere.
+        return getattr(self.sink, "buffer", None)
 
     def write(self, offset, value):
-        self.buffer.append(value)
+        self.sink.write(value)
 
+    def snapshot(self):
+        return self.sink.snapshot()
 
-class Instruction:
-    def __init__(self, opcode):
+    def restore(self, state):
+        if state is not None:
+            self.sink.restore(state)
+
+
+class Keyboard:
+    # Two registers: status at offset reads 1 while input is waiting, data at offset + 1 pops the next
+    # byte, or reads 0 if there is none. Input goes through a deque, so feed() can be called from any
+    # thread while the machine runs and a read never blocks. feed_at() delivers input at an exact cycle
+    # instead. Either way, arriving input raises an interrupt.
+    def __init__(self, offset, script=b"", events=None, interrupt=None):
+        self.offset = offset
+        self.queue = collections.deque(script)
+        self.events = events
+        self.interrupt = interrupt
+        self.scheduled = {}
+
+    def feed(self, data):
+        self.queue.extend(data)
+        if self.interrupt is not None:
+            self.interrupt()
+
+    def feed_at(self, cycle, data):
+        event = self.events.schedule(cycle, self._arrive)
+        self.scheduled[event] = bytes(data)
+
+    def _arrive(self, cycle):
+        for event in [event for event in self.scheduled if event.cycle == cycle]:
+            self.feed(self.scheduled.pop(event))
+
+    def read(self, offset):
+        register = offset - self.offset
+        if register == 0:
+            return 1 if self.queue else 0
+        if register == 1 and self.queue:
+            return self.queue.popleft()
+        return 0
+
+    def write(self, offset, value):
+        pass
+
+    def snapshot(self):
+        return bytes(self.queue), sorted((event.cycle, data) for event, data in self.scheduled.items())
+
+    def restore(self, state):
+        queue, scheduled = state
+        self.queue.clear()
+        self.queue.extend(queue)
+        for event in self.scheduled:
+            self.events.cancel(event)
+        self.scheduled.clear()
+        for cycle, data in scheduled:
+            self.feed_at(cycle, data)
+
+
+# Each micro-op is one statement on the cpu. An instruction's microcode lists the micro-ops for every cycle
+# after the two shared ones (cycle 0 does nothing, cycle 1 fetches the opcode); its last cycle ends it.
+MICRO_OPS = {
+    "operand_low": "cpu.index = cpu.bus.read(cpu.pc + 1)",
+    "operand_high": "cpu.index += cpu.bus.read(cpu.pc + 2) << 8",
+    "load": "cpu.acc = cpu.bus.read(cpu.index)",
+    "store": "cpu.bus.write(cpu.index, cpu.acc)",
+    "read_buffer": "cpu.buffer = cpu.bus.read(cpu.index)",
+    "add": "cpu.acc = (cpu.acc + cpu.buffer) % 0x100",
+    "next": "cpu.pc += 3",
+    "branch": "cpu.pc = cpu.index if cpu.acc == 0 else cpu.pc + 3",
+    "wait": "if cpu.interrupt_pending: cpu.interrupt_pending = False; cpu.pc += 3",
+}
+
+
+def _compile_microcode(microcode):
+    # Returns execute(cpu), which runs every micro-op in one call, tick(cpu), which runs the micro-ops of the
+    # cycle in tick_counter, and one step function per cycle.
+    cycles = [[MICRO_OPS[op] for op in ops] or ["pass"] for ops in microcode]
+    cycles[-1] = cycles[-1] + ["cpu.tick_counter = 0"]
+    functions = {"execute": [line for lines in cycles for line in lines if line != "cpu.tick_counter = 0"],
+                 "tick": ["counter = cpu.tick_counter"]}
+    for index, lines in enumerate(cycles):
+        functions["tick"].append(f"{'if' if index == 0 else 'elif'} counter == {index + 2}:")
+        functions["tick"] += [f"    {line}" for line in lines]
+        functions[f"step_{index}"] = lines
+    source = "".join(f"def {name}(cpu):\n" + "".join(f"    {line}\n" for line in body)
+                     for name, body in functions.items())
+    namespace = {}
+    exec(compile(source, "<microcode>", "exec"), namespace)
+    steps = tuple(namespace[f"step_{index}"] for index in range(len(microcode)))
+    return namespace["execute"], namespace["tick"], steps
+
+
+class IllegalOpcode(KeyError):
+    # Raised when the cpu fetches an opcode it has no instruction for. The cpu is left at the start of that
+    # instruction, with pc pointing at the opcode.
+    def __init__(self, opcode, pc):
+        super().__init__(opcode)
         self.opcode = opcode
+        self.pc = pc
 
+    def __str__(self):
+        return f"illegal opcode {self.opcode:#04x} at {self.pc:#06x}"
+
+
+class Instruction:
+    reads = False
+    writes = False
+    branches = False
+    waits = False
+    opcode = None
+    microcode = ()
+    _compiled = {}
 
-class LoadDirect(Instruction):
     def __init__(self):
-        super().__init__(0x01)
+        self.cycles = 2 + len(self.microcode)
+        compiled = Instruction._compiled.get(self.microcode)
+        if compiled is None:
+            compiled = Instruction._compiled[self.microcode] = _compile_microcode(self.microcode)
+        execute, tick, self.steps = compiled
+        # The compiled functions replace the generic methods below unless a subclass overrides them.
+        if type(self).execute is Instruction.execute:
+            self.execute = execute
+        if type(self).tick is Instruction.tick:
+            self.tick = tick
+
+    def execute(self, cpu):
+        for step in self.steps:
+            step(cpu)
 
     def tick(self, cpu):
-        if cpu.tick_counter == 2:
-            cpu.index = cpu.bus.read(cpu.pc + 1)
-        elif cpu.tick_counter == 3:
-            cpu.index += cpu.bus.read(cpu.pc + 2) << 8
-        elif cpu.tick_counter == 4:
-            cpu.acc = cpu.bus.read(cpu.index)
-            cpu.pc += 3
-            cpu.tick_counter = 0
+        self.steps[cpu.tick_counter - 2](cpu)
+
+
+class LoadDirect(Instruction):
+    reads = True
+    opcode = 0x01
+    microcode = (("operand_low",), ("operand_high",), ("load", "next"))
+
+    def translate(self, address, operand, value):
+        return [f"acc = {value}"]
 
 
 class StoreDirect(Instruction):
-    def __init__(self):
-        super().__init__(0x02)
+    writes = True
+    opcode = 0x02
+    microcode = (("operand_low",), ("operand_high",), ("store", "next"))
 
-    def tick(self, cpu):
-        if cpu.tick_counter == 2:
-            cpu.index = cpu.bus.read(cpu.pc + 1)
-        elif cpu.tick_counter == 3:
-            cpu.index += cpu.bus.read(cpu.pc + 2) << 8
-        elif cpu.tick_counter == 4:
-            cpu.bus.write(cpu.index, cpu.acc)
-            cpu.pc += 3
-            cpu.tick_counter = 0
+    def translate(self, address, operand, value):
+        return [f"write({operand}, acc)"]
 
 
 class AddDirect(Instruction):
-    def __init__(self):
-        super().__init__(0x03)
+    reads = True
+    opcode = 0x03
+    microcode = (("operand_low",), ("operand_high",), ("read_buffer",), ("add", "next"))
 
-    def tick(self, cpu):
-        if cpu.tick_counter == 2:
-            cpu.index = cpu.bus.read(cpu.pc + 1)
-        elif cpu.tick_counter == 3:
-            cpu.index += cpu.bus.read(cpu.pc + 2) << 8
-        elif cpu.tick_counter == 4:
-            cpu.buffer = cpu.bus.read(cpu.index)
-        elif cpu.tick_counter == 5:
-            cpu.acc = (cpu.acc + cpu.buffer) % 0x100
-            cpu.pc += 3
-            cpu.tick_counter = 0
+    def translate(self, address, operand, value):
+        return [f"buffer = {value}", "acc = (acc + buffer) % 0x100"]
 
 
 class BranchIfZeroSet(Instruction):
+    branches = True
+    opcode = 0x04
+    microcode = (("operand_low",), ("operand_high",), ("branch",))
+
+    def translate(self, address, operand, value):
+        return [f"pc = {operand} if acc == 0 else {address + 3:#06x}"]
+
+
+class WaitForInterrupt(Instruction):
+    # Repeats until an interrupt is pending, then clears it and moves on. It has no translation, so it
+    # always ends a translated block.
+    waits = True
+    opcode = 0x05
+    microcode = (("operand_low",), ("operand_high",), ("wait",))
+
+
+class IllegalInstruction(Instruction):
+    # Fills every dispatch slot without an instruction. It traps on the first tick after the fetch, so it
+    # takes three cycles to reach, like any other instruction's first micro-op.
     def __init__(self):
-        super().__init__(0x04)
+        self.cycles = 3
+
+    def execute(self, cpu):
+        raise IllegalOpcode(cpu.bus.read(cpu.pc), cpu.pc)
 
     def tick(self, cpu):
-        if cpu.tick_counter == 2:
-            cpu.index = cpu.bus.read(cpu.pc + 1)
-        elif cpu.tick_counter == 3:
-            cpu.index += cpu.bus.read(cpu.pc + 2) << 8
-        elif cpu.tick_counter == 4:
-            if cpu.acc == 0:
-                cpu.pc = cpu.index
-            else:
-                cpu.pc += 3
-            cpu.tick_counter = 0
+        cpu.tick_counter = 0
+        raise IllegalOpcode(cpu.bus.read(cpu.pc), cpu.pc)
+
+
+INSTRUCTION_SET = (LoadDirect, StoreDirect, AddDirect, BranchIfZeroSet, WaitForInterrupt)
+CYCLES = {instruction.opcode: instruction().cycles for instruction in INSTRUCTION_SET}
+
+# System's memory map. Everything from DEVICES up is a device, where reads and writes have side effects.
+CHAR_OUT = 0xf000
+KEYBOARD = 0xf100
+TIMER = 0xf200
+DISPLAY = 0xf800
+DEVICES = CHAR_OUT
+
+
+class Unmapped:
+    def read(self, offset):
+        return None
+
+    def write(self, offset, value):
+        pass
 
 
 class Bus:
+    page_bits = 8
+    page_size = 1 << page_bits
+    address_space = 0x10000
+
     def __init__(self, devices):
-        self.devices = devices[:]
-        self.devices.sort(key=lambda device: -device.offset)
+        self.mappings = [(device, None) for device in devices]
+        self.write_observers = []
+        self._decode()
+
+    @property
+    def devices(self):
+        return [device for device, size in self.mappings]
+
+    def register(self, device, size=None):
+        self.mappings.append((device, size))
+        try:
+            self._decode()
+        except ValueError:
+            self.mappings.pop()
+            raise
+
+    def regions(self):
+        # Devices mapped without a size extend up to the next device, or the end of the address space.
+        mappings = sorted(self.mappings, key=lambda mapping: mapping[0].offset)
+        regions = []
+        for i, (device, size) in enumerate(mappings):
+            if size is None:
+                end = mappings[i + 1][0].offset if i + 1 < len(mappings) else self.address_space
+            else:
+                end = device.offset + size
+            regions.append((device.offset, end, device))
+        return regions
+
+    def _decode(self):
+        unmapped = Unmapped()
+        pages = [unmapped] * (self.address_space >> self.page_bits)
+        previous_end = 0
+        for start, end, device in self.regions():
+            if start % self.page_size or end % self.page_size:
+                raise ValueError(f"Device at {start:#06x}-{end:#06x} is not aligned to {self.page_size:#x} byte pages")
+            # A sizeless device followed by another at the same offset would be left with an empty region.
+            if start < previous_end or end <= start:
+                raise ValueError(f"Device at {start:#06x}-{end:#06x} overlaps another device")
+            if end > self.address_space:
+                raise ValueError(f"Device at {start:#06x}-{end:#06x} is outside the address space")
+            for page in range(start >> self.page_bits, end >> self.page_bits):
+                pages[page] = device
+            previous_end = end
+        self.pages = pages
 
     def read(self, offset):
-        for device in self.devices:
-            if offset >= device.offset:
-                return device.read(offset)
+        return self.pages[offset >> 8].read(offset)
 
     def write(self, offset, value):
-        for device in self.devices:
-            if offset >= device.offset:
-                device.write(offset, value)
-                return
+        self.pages[offset >> 8].write(offset, value)
+        for observer in self.write_observers:
+            observer(offset, value)
+
+    def device(self, offset):
+        return self.pages[offset >> 8]
 
 
 class Cpu:
-    def __init__(self, bus: Bus):
-        instructions = [LoadDirect(), StoreDirect(), AddDirect(), BranchIfZeroSet()]
-        self.instructions = {instruction.opcode: instruction for instruction in instructions}
-        assert len(instructions) == len(self.instructions)
+    __slots__ = ("instructions", "pc", "acc", "index", "bus", "tick_counter", "instruction", "buffer", "halted",
+                 "interrupt_pending", "observers", "translator", "budget", "remaining", "_loop_entry",
+                 "_busy_loops")
+    max_idle_loop = 32
+
+    def __init__(self, bus: Bus, translate=False):
+        # Opcodes index straight into a 256 entry dispatch list; unused entries trap.
+        self.instructions = [IllegalInstruction()] * 0x100
+        for instruction in INSTRUCTION_SET:
+            assert isinstance(self.instructions[instruction.opcode], IllegalInstruction)
+            self.instructions[instruction.opcode] = instruction()
         self.pc = 0
         self.acc = 0
         self.index = 0
         self.bus = bus
         self.tick_counter = 0
         self.instruction = None
+        self.buffer = 0
+        self.halted = False
+        self.interrupt_pending = False
+        self.observers = []
+        self.translator = Translator(self) if translate else None
+        # The cycles the current run was given and how many will be left once the instruction, block or tick
+        # being executed is over. Both are 0 outside of runs.
+        self.budget = 0
+        self.remaining = 0
+        self._loop_entry = None
+        self._busy_loops = set()
+
+    def interrupt(self):
+        self.interrupt_pending = True
 
     def tick(self, ticks=1):
         for _ in range(ticks):
             self._tick()
 
+    def step(self):
+        if self.tick_counter != 0:
+            ticks = 0
+            while self.tick_counter != 0:
+                self._tick()
+                ticks += 1
+            return ticks
+        self.instruction = self.instructions[self.bus.read(self.pc)]
+        self.instruction.execute(self)
+        return self.instruction.cycles
+
+    def run_instructions(self, count):
+        ticks = 0
+        for _ in range(count):
+            ticks += self.step()
+        return ticks
+
+    def attach(self, observer):
+        # Observers get observer.instruction(cpu, pc, instruction) after every completed instruction. An
+        # observer that also has translate(instructions) is compiled into translated blocks instead: it gets
+        # the block's (address, instruction, operand) entries and returns source lines plus the namespace
+        # they refer to.
+        self.observers.append(observer)
+        self._reset_translations()
+
+    def detach(self, observer):
+        self.observers.remove(observer)
+        self._reset_translations()
+
+    def _reset_translations(self):
+        if self.translator is not None:
+            self.translator.reset()
+
+    def _interpreted(self):
+        # Observers that cannot be compiled into blocks need every instruction to be interpreted.
+        return any(not hasattr(observer, "translate") for observer in self.observers)
+
+    def snapshot(self):
+        return self.pc, self.acc, self.index, self.tick_counter, self.instruction, self.buffer, self.interrupt_pending
+
+    def restore(self, state):
+        (self.pc, self.acc, self.index, self.tick_counter, self.instruction, self.buffer,
+         self.interrupt_pending) = state
+        self.flush_translations()
+
+    def flush_translations(self):
+        # For new memory contents, which also clears what the translator learnt about patched code.
+        self._busy_loops.clear()
+        if self.translator is not None:
+            self.translator.forget()
+
+    def end_run(self):
+        # Ends the current run once the instruction, block or tick being executed is over, as if that had used
+        # up its cycles. Returns the number of cycles the run will have executed.
+        self.budget -= self.remaining
+        self.remaining = 0
+        return self.budget
+
+    def run(self, cycles, stop_on_halt=False):
+        # Same result as tick(cycles), but whole blocks or instructions are executed in one call while they fit.
+        # Once the cpu is caught in a loop that can never change its state, whole iterations are skipped, or
+        # the run stops early if stop_on_halt is set. Returns the number of cycles actually executed.
+        instructions = self.instructions
+        bus = self.bus
+        observers = self.observers
+        translator = self.translator
+        blocks = translator.blocks if translator is not None and not self._interpreted() else None
+        busy_loops = self._busy_loops
+        self.budget = cycles
+        self.halted = False
+        # Whatever the caller changed since the last run may have broken the pass through a loop.
+        self._loop_entry = None
+        while cycles > 0:
+            if self.tick_counter == 0:
+                pc = self.pc
+                if blocks is not None:
+                    block = blocks.get(pc)
+                    if block is None:
+                        block = translator.translate(pc)
+                    if block is not None and block.cycles <= cycles:
+                        self.remaining = cycles - block.cycles
+                        block.function(self)
+                        cycles = self.remaining
+                        # Most loops are busy, and blocks run often enough to check that here first.
+                        if self.pc < block.end and (self.pc << 16 | block.end - 3) not in busy_loops:
+                            loop = self._idle_loop(self.pc, block.end - 3)
+                            if loop:
+                                self.halted = True
+                                if stop_on_halt:
+                                    break
+                                if not observers:
+                                    cycles %= loop
+                        continue
+                instruction = instructions[bus.read(pc)]
+                if instruction.cycles <= cycles:
+                    self.instruction = instruction
+                    self.remaining = cycles - instruction.cycles
+                    instruction.execute(self)
+                    cycles = self.remaining
+                    for observer in observers:
+                        observer.instruction(self, pc, instruction)
+                    if self.pc <= pc:
+                        # A wait with no interrupt pending, or a branch taken back into an idle loop.
+                        loop = instruction.cycles if self.pc == pc else self._idle_loop(self.pc, pc)
+                        if loop:
+                            self.halted = True
+                            if stop_on_halt:
+                                break
+                            if not observers:
+                                cycles %= loop
+                    continue
+            pc = self.pc
+            self.remaining = cycles - 1
+            self._tick()
+            cycles = self.remaining
+            if observers and self.tick_counter == 0:
+                for observer in observers:
+                    observer.instruction(self, pc, self.instruction)
+        executed = self.budget - cycles
+        self.budget = self.remaining = 0
+        return executed
+
+    def _idle_loop(self, start, branch):
+        # Called when the branch at branch was taken back to start, so with acc == 0. If the instructions from
+        # start on run straight through to that branch and only read memory, a pass entered with acc == 0
+        # that comes back to start leaves the same state as it found, and the loop never ends. That is known
+        # once the branch is taken again exactly one pass after it was last taken, or at once for a branch to
+        # itself. Returns the cycles of one pass then, or None. Loops that are not idle are remembered in
+        # _busy_loops, by start << 16 | branch, until new memory contents are loaded, so one that is patched
+        # into an idle loop later is not recognised.
+        now = self.budget - self.remaining
+        entry, self._loop_entry = self._loop_entry, (start, branch, now)
+        key = start << 16 | branch
+        if key in self._busy_loops:
+            return None
+        bus = self.bus
+        cycles = 0
+        for address in range(start, branch + 3, 3):
+            if (branch - start) // 3 >= self.max_idle_loop or \
+                    not all(isinstance(bus.device(a), Memory) for a in range(address, address + 3)):
+                break
+            instruction = self.instructions[bus.read(address)]
+            operand = bus.read(address + 1) | bus.read(address + 2) << 8
+            if isinstance(instruction, IllegalInstruction) or instruction.writes or instruction.waits or \
+                    instruction.branches != (address == branch) or \
+                    instruction.reads and not isinstance(bus.device(operand), Memory):
+                break
+            cycles += instruction.cycles
+        else:
+            return cycles if start == branch or entry == (start, branch, now - cycles) else None
+        self._busy_loops.add(key)
+        return None
+
+    def run_until(self, cycles, conditions):
+        # Like run(), but stops at the first instruction boundary where one of the conditions is met.
+        if not conditions and not self.observers:
+            executed = self.run(cycles, stop_on_halt=True)
+            return Stop(Stop.HALTED if self.halted else Stop.CYCLES, executed)
+        if self.translator is not None:
+            self.translator.watch(conditions)
+        try:
+            return self._run_until(cycles, conditions)
+        finally:
+            self.budget = self.remaining = 0
+            if self.translator is not None:
+                self.translator.watch(None)
+
+    def _run_until(self, cycles, conditions, stop_on_halt=True):
+        # Observers see every instruction, so halted loops are never skipped here.
+        instructions = self.instructions
+        bus = self.bus
+        observers = self.observers
+        translator = self.translator
+        blocks = translator.blocks if translator is not None and not self._interpreted() else None
+        breakpoints = conditions.breakpoints
+        self.budget = cycles
+        start = self.pc
+        self.halted = False
+        self._loop_entry = None
+        while cycles > 0:
+            if self.tick_counter == 0:
+                pc = self.pc
+                if pc in breakpoints and (pc != start or cycles != self.budget):
+                    return Stop(Stop.BREAKPOINT, self.budget - cycles, pc)
+                if blocks is not None:
+                    block = blocks.get(pc)
+                    if block is None:
+                        block = translator.translate(pc)
+                    if block is not None and block.cycles <= cycles:
+                        self.remaining = cycles - block.cycles
+                        block.function(self)
+                        cycles = self.remaining
+                        if block.watched:
+                            reason = conditions.hit(block.last, block.operand)
+                            if reason is not None:
+                                return Stop(reason, self.budget - cycles, block.operand)
+                        if self.pc < block.end and self._idle_loop(self.pc, block.end - 3):
+                            self.halted = True
+                            if stop_on_halt:
+                                return Stop(Stop.HALTED, self.budget - cycles)
+                        continue
+                instruction = instructions[bus.read(pc)]
+                if instruction.cycles <= cycles:
+                    self.instruction = instruction
+                    self.remaining = cycles - instruction.cycles
+                    instruction.execute(self)
+                    cycles = self.remaining
+                    for observer in observers:
+                        observer.instruction(self, pc, instruction)
+                    reason = conditions.hit(instruction, self.index)
+                    if reason is not None:
+                        return Stop(reason, self.budget - cycles, self.index)
+                    if self.pc == pc or self.pc < pc and self._idle_loop(self.pc, pc):
+                        self.halted = True
+                        if stop_on_halt:
+                            return Stop(Stop.HALTED, self.budget - cycles)
+                    continue
+            pc = self.pc
+            self.remaining = cycles - 1
+            self._tick()
+            cycles = self.remaining
+            if self.tick_counter == 0:
+                for observer in observers:
+                    observer.instruction(self, pc, self.instruction)
+                reason = conditions.hit(self.instruction, self.index)
+                if reason is not None:
+                    return Stop(reason, self.budget - cycles, self.index)
+        return Stop(Stop.CYCLES, self.budget - cycles)
+
     def _tick(self):
         if self.tick_counter == 0:
             self.tick_counter += 1
@@ -137,16 +712,140 @@ class Cpu:
                 self.tick_counter += 1
 
 
+class Snapshot:
+    def __init__(self, cpu, devices, cycle=0):
+        self.cpu = cpu
+        self.devices = devices
+        self.cycle = cycle
+
+
 class System:
-    def __init__(self):
-        self.memory = Memory(0x0000, [])
-        self.char_out = CharacterOutput(0xf000)
-        self.bus = Bus([self.memory, self.char_out])
-        self.cpu = Cpu(self.bus)
+    def __init__(self, translate=False, sink=None, memory=None):
+        self.events = EventQueue()
+        self.memory = Memory(0x0000) if memory is None else memory
+        self.char_out = CharacterOutput(CHAR_OUT, sink)
+        self.keyboard = Keyboard(KEYBOARD, events=self.events, interrupt=self._interrupt)
+        self.timer = Timer(TIMER, self.events, self._interrupt, clock=self._clock)
+        self.display = Display(DISPLAY)
+        self.devices = [self.memory, self.char_out, self.keyboard, self.timer, self.display]
+        self.bus = Bus(self.devices)
+        self.cpu = Cpu(self.bus, translate)
+
+    def _interrupt(self):
+        self.cpu.interrupt()
+
+    def _clock(self):
+        # The cycle a device is written on, which is where the cpu run ends, so that System.run sees whatever
+        # the device schedules in time.
+        return self.events.now + self.cpu.end_run()
+
+    @property
+    def cycle(self):
+        # During a cpu run, up to the end of the instruction, block or tick in progress.
+        cpu = self.cpu
+        return self.events.now + cpu.budget - cpu.remaining
 
     def load(self, binary):
-        self.memory.contents = binary
-
-    def run(self, cycles):
-        for _ in range(cycles):
-            self.cpu.tick()
+        self.memory.clear()
+        self.memory.load(binary)
+        self.cpu.flush_translations()
+
+    def run(self, cycles, stop_on_halt=False):
+        # Cpu runs end exactly on the cycles that events are scheduled for, so devices act on the same cycle
+        # however a run is split up. A cpu waiting for an interrupt skips straight to the next event.
+        events = self.events
+        cpu = self.cpu
+        executed = 0
+        while True:
+            events.advance()
+            if executed >= cycles:
+                return executed
+            due = events.next()
+            budget = cycles - executed if due is None else min(cycles - executed, due - events.now)
+            count = cpu.run(budget, stop_on_halt)
+            if count < budget and cpu.instruction.waits and due is not None:
+                count += cpu.run(budget - count)
+            executed += count
+            events.now += count
+            if count < budget and cpu.halted:
+                return executed
+
+    def run_until(self, max_cycles, breakpoints=(), reads=(), writes=(), output=None):
+        conditions = Conditions(breakpoints, reads, writes, output)
+        events = self.events
+        cpu = self.cpu
+        executed = 0
+        while True:
+            events.advance()
+            if executed and cpu.tick_counter == 0 and cpu.pc in conditions.breakpoints:
+                # The cpu only skips a breakpoint at the pc it starts from, which is where the last run ended.
+                return Stop(Stop.BREAKPOINT, executed, cpu.pc)
+            due = events.next()
+            budget = max_cycles - executed if due is None else min(max_cycles - executed, due - events.now)
+            stop = cpu.run_until(budget, conditions)
+            if stop.reason == Stop.HALTED and cpu.instruction.waits and due is not None:
+                stop = Stop(Stop.CYCLES, stop.cycles + cpu.run(budget - stop.cycles))
+            executed += stop.cycles
+            events.now += stop.cycles
+            if stop.reason != Stop.CYCLES or executed >= max_cycles:
+                events.advance()
+                return Stop(stop.reason, executed, stop.address)
+
+    async def run_async(self, cycles, slice=10000, input=None, stop_on_halt=False):
+        # Runs in slices of about slice cycles, yielding to the event loop between them so many machines can
+        # share one loop. Slices are stretched to the end of the instruction in progress, so a cancelled run
+        # leaves the cpu at an instruction boundary. Bytes waiting in the input asyncio.Queue are fed to the
+        # keyboard before every slice. A guest that waits for an interrupt with nothing scheduled can only be
+        # woken by input, so the run awaits the queue instead, without advancing the clock. Returns the number
+        # of cycles executed.
+        cpu = self.cpu
+        executed = 0
+        while executed < cycles:
+            if input is not None:
+                while not input.empty():
+                    self.keyboard.feed(input.get_nowait())
+            budget = min(slice, cycles - executed)
+            count = self.run(budget, stop_on_halt or input is not None)
+            if input is not None and not stop_on_halt and self.halted:
+                if cpu.instruction.waits:
+                    executed += count
+                    self.keyboard.feed(await input.get())
+                    continue
+                count += self.run(budget - count)
+            executed += count
+            while cpu.tick_counter != 0 and executed < cycles:
+                executed += self.run(1)
+            if stop_on_halt and self.halted:
+                break
+            await asyncio.sleep(0)
+        return executed
+
+    @property
+    def halted(self):
+        # A cpu waiting for an interrupt is only halted if nothing is scheduled that could deliver one.
+        cpu = self.cpu
+        return cpu.halted and not (cpu.instruction.waits and self.events)
+
+    def snapshot(self):
+        return Snapshot(self.cpu.snapshot(), [device.snapshot() for device in self.devices], self.events.now)
+
+    def restore(self, snapshot):
+        # Devices put their pending events back on the cleared queue.
+        self.events.clear(snapshot.cycle)
+        for device, state in zip(self.devices, snapshot.devices):
+            device.restore(state)
+        self.cpu.restore(snapshot.cpu)
+
+    def fork(self):
+        snapshot = self.snapshot()
+        memory = Memory.from_snapshot(self.memory.offset, snapshot.devices[self.devices.index(self.memory)])
+        translator = self.cpu.translator
+        system = System(translator is not None, self.char_out.sink.fork(), memory)
+        system.restore(snapshot)
+        if translator is not None and not self.cpu.observers:
+            # Compiled blocks do not refer to the cpu they were compiled for, so forks share them, and the fork
+            # runs the same code, so what was learnt about patched code still holds.
+            system.cpu.translator.code = translator.code
+            system.cpu.translator.invalidations.update(translator.invalidations)
+            system.cpu.translator.patched.update(translator.patched)
+        return system
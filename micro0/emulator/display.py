@@ -0,0 +1,101 @@
+import threading
+import time
+
+
+class Display:
+    # A character grid framebuffer. Writes that change a cell mark its row dirty, so renderers only have
+    # to redraw rows that changed since they last looked. Writes past the end of the grid are ignored.
+    def __init__(self, offset, columns=40, rows=25):
+        self.offset = offset
+        self.columns = columns
+        self.rows = rows
+        self.cells = bytearray(b" " * (columns * rows))
+        self.dirty = bytearray(b"\x01" * rows)
+
+    def read(self, offset):
+        index = offset - self.offset
+        return self.cells[index] if index < len(self.cells) else 0
+
+    def write(self, offset, value):
+        index = offset - self.offset
+        if index < len(self.cells) and self.cells[index] != value:
+            self.cells[index] = value
+            self.dirty[index // self.columns] = 1
+
+    def row(self, row):
+        return bytes(self.cells[row * self.columns:(row + 1) * self.columns])
+
+    def take_dirty(self):
+        # Each flag is cleared before its row is read back, so a write racing with a renderer on another
+        # thread is picked up by the next call at the latest.
+        rows = []
+        for row in range(self.rows):
+            if self.dirty[row]:
+                self.dirty[row] = 0
+                rows.append(row)
+        return rows
+
+    def snapshot(self):
+        return bytes(self.cells)
+
+    def restore(self, state):
+        self.cells[:] = state
+        self.dirty[:] = b"\x01" * self.rows
+
+
+class TextRenderer:
+    # Keeps a text copy of the screen for headless tests and snapshots.
+    def __init__(self, display):
+        self.display = display
+        self.lines = [""] * display.rows
+
+    def refresh(self):
+        rows = self.display.take_dirty()
+        for row in rows:
+            self.lines[row] = self.display.row(row).decode("latin-1")
+        return rows
+
+    def text(self):
+        return "\n".join(line.rstrip() for line in self.lines).rstrip("\n")
+
+
+class TerminalRenderer:
+    # Redraws changed rows on an ANSI terminal.
+    def __init__(self, display, stream):
+        self.display = display
+        self.stream = stream
+
+    def refresh(self):
+        rows = self.display.take_dirty()
+        if rows:
+            output = []
+            for row in rows:
+                line = self.display.row(row).decode("latin-1")
+                output.append(f"\x1b[{row + 1};1H{line}")
+            self.stream.write("".join(output))
+            self.stream.flush()
+        return rows
+
+
+class RenderLoop:
+    # Refreshes a renderer at a fixed rate on a background thread while the machine keeps running.
+    def __init__(self, renderer, rate=30):
+        self.renderer = renderer
+        self.interval = 1 / rate
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.renderer.refresh()
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self.stopped.is_set():
+            self.renderer.refresh()
+            deadline += self.interval
+            self.stopped.wait(max(0, deadline - time.monotonic()))
@@ -0,0 +1,124 @@
+import heapq
+import itertools
+
+
+class Event:
+    def __init__(self, cycle, action):
+        self.cycle = cycle
+        self.action = action
+        self.cancelled = False
+
+
+class EventQueue:
+    # Actions scheduled for an absolute cycle. now is the cycle the system has run up to; System.run ends
+    # its cpu runs exactly on the next scheduled cycle and then fires everything that is due, in the order
+    # it was scheduled in.
+    def __init__(self):
+        self.heap = []
+        self.sequence = itertools.count()
+        self.now = 0
+
+    def __bool__(self):
+        return self.next() is not None
+
+    def schedule(self, cycle, action):
+        # action(cycle) is called once now reaches cycle. Returns an event that can be cancelled.
+        event = Event(max(cycle, self.now), action)
+        heapq.heappush(self.heap, (event.cycle, next(self.sequence), event))
+        return event
+
+    def schedule_in(self, cycles, action):
+        return self.schedule(self.now + cycles, action)
+
+    def cancel(self, event):
+        event.cancelled = True
+
+    def next(self):
+        # The cycle of the earliest pending event, or None if there is none.
+        heap = self.heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def advance(self):
+        # Fires every event that is due at now, including events that those schedule for now.
+        heap = self.heap
+        while heap and heap[0][0] <= self.now:
+            event = heapq.heappop(heap)[2]
+            if not event.cancelled:
+                event.action(event.cycle)
+
+    def clear(self, now=0):
+        self.heap.clear()
+        self.now = now
+
+
+class Timer:
+    # Expires every period cycles once started, at exact cycles counted from the start. Registers: offset
+    # reads 1 once the timer has expired since it was last read, offset + 1 is the control register whose
+    # bit 0 enables the interrupt on expiry, and offset + 2 / + 3 hold the period's low and high bytes.
+    # Writing the control register with bit 1 set restarts the timer, to expire first one period after the
+    # cycle of the write, which clock() returns; without a clock the guest cannot start it. A period the
+    # guest writes otherwise takes effect from the next expiry. Hosts use start() and stop().
+    def __init__(self, offset, events, interrupt=None, period=0, clock=None):
+        self.offset = offset
+        self.events = events
+        self.interrupt = interrupt
+        self.clock = clock
+        self.period = period
+        self.control = 0
+        self.expired = 0
+        self.event = None
+
+    def start(self, period=None, cycle=None):
+        # Expires first at cycle, or one period from now.
+        self.stop()
+        if period is not None:
+            self.period = period
+        if self.period:
+            start = self.events.now + self.period if cycle is None else cycle
+            self.event = self.events.schedule(start, self._expire)
+
+    def stop(self):
+        if self.event is not None:
+            self.events.cancel(self.event)
+            self.event = None
+
+    def _expire(self, cycle):
+        self.expired = 1
+        if self.control & 1 and self.interrupt is not None:
+            self.interrupt()
+        self.event = self.events.schedule(cycle + self.period, self._expire) if self.period else None
+
+    def read(self, offset):
+        register = offset - self.offset
+        if register == 0:
+            expired, self.expired = self.expired, 0
+            return expired
+        if register == 1:
+            return self.control
+        if register == 2:
+            return self.period & 0xff
+        if register == 3:
+            return self.period >> 8 & 0xff
+        return 0
+
+    def write(self, offset, value):
+        register = offset - self.offset
+        if register == 1:
+            self.control = value
+            if value & 2 and self.clock is not None:
+                self.start(cycle=self.clock() + self.period)
+        elif register == 2:
+            self.period = self.period & 0xff00 | value
+        elif register == 3:
+            self.period = self.period & 0x00ff | value << 8
+
+    def snapshot(self):
+        return self.period, self.control, self.expired, None if self.event is None else self.event.cycle
+
+    def restore(self, state):
+        self.period, self.control, self.expired, cycle = state
+        self.stop()
+        if cycle is not None:
+            self.event = self.events.schedule(cycle, self._expire)
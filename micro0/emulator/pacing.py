@@ -0,0 +1,92 @@
+import time
+
+
+class PacingReport:
+    # drift is how far the run ended behind (positive) or ahead of (negative) the target clock, in seconds,
+    # and max_lag the furthest it fell behind on the way.
+    def __init__(self, cycles, elapsed, target_hz, drift, max_lag, batches):
+        self.cycles = cycles
+        self.elapsed = elapsed
+        self.target_hz = target_hz
+        self.drift = drift
+        self.max_lag = max_lag
+        self.batches = batches
+
+    @property
+    def hz(self):
+        return self.cycles / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        target = "fast" if self.target_hz is None else f"{self.target_hz:.0f} Hz"
+        return (f"PacingReport({self.cycles} cycles in {self.elapsed:.3f} s, {self.hz:.0f} Hz, target {target}, "
+                f"drift {self.drift * 1000:+.3f} ms)")
+
+
+class Pacer:
+    # Runs a system at hz emulated cycles per second, or as fast as possible if hz is None.
+    # Cycles run in batches of about interval seconds of emulated time. Between batches it sleeps until the
+    # next deadline, giving up the last spin seconds of each wait with sleep(0) to keep wake-ups precise.
+    # Deadlines are derived from the cycles executed since the start, so sleep jitter does not accumulate.
+    # While the host falls behind, batches grow to cut per-batch overhead, up to max_batch_factor times the
+    # base size; once it catches up they shrink back.
+    def __init__(self, system, hz=None, interval=0.01, spin=0.001, max_batch_factor=16,
+                 clock=time.perf_counter, sleep=time.sleep):
+        self.system = system
+        self.hz = hz
+        self.interval = interval
+        self.spin = spin
+        self.max_batch_factor = max_batch_factor
+        self.clock = clock
+        self.sleep = sleep
+        self.stopped = False
+
+    def stop(self):
+        # Safe to call from another thread; the run ends after the current batch.
+        self.stopped = True
+
+    def run(self, cycles=None, duration=None, stop_on_halt=False):
+        # Runs until cycles have been executed, duration seconds have passed, stop() is called or, with
+        # stop_on_halt, the cpu halts.
+        self.stopped = False
+        clock = self.clock
+        start = clock()
+        base = max(1, int(self.hz * self.interval)) if self.hz is not None else 0x10000
+        batch = base
+        done = 0
+        batches = 0
+        max_lag = 0.0
+        while not self.stopped:
+            if cycles is not None and done >= cycles:
+                break
+            if duration is not None and clock() - start >= duration:
+                break
+            count = batch if cycles is None else min(batch, cycles - done)
+            before = clock()
+            executed = self.system.run(count, stop_on_halt)
+            after = clock()
+            done += executed
+            batches += 1
+            if executed < count:
+                break
+            if self.hz is None:
+                # Keep batches near interval seconds so stop() and duration stay responsive.
+                if after > before:
+                    batch = max(1, int(executed * self.interval / (after - before)))
+                continue
+            lag = after - (start + done / self.hz)
+            if lag > 0:
+                max_lag = max(max_lag, lag)
+                batch = min(batch * 2, base * self.max_batch_factor)
+            else:
+                batch = max(base, batch // 2)
+                self._sleep_until(start + done / self.hz)
+        elapsed = clock() - start
+        drift = elapsed - done / self.hz if self.hz is not None else 0.0
+        return PacingReport(done, elapsed, self.hz, drift, max_lag, batches)
+
+    def _sleep_until(self, deadline):
+        remaining = deadline - self.clock()
+        if remaining > self.spin:
+            self.sleep(remaining - self.spin)
+        while self.clock() < deadline:
+            self.sleep(0)
@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from micro0.emulator.computer import System
+
+
+class Job:
+    def __init__(self, binary, cycles, patches=()):
+        self.binary = binary
+        self.cycles = cycles
+        self.patches = patches
+
+
+class JobResult:
+    def __init__(self, output, pc, acc, index, tick_counter):
+        self.output = output
+        self.pc = pc
+        self.acc = acc
+        self.index = index
+        self.tick_counter = tick_counter
+
+
+def run_job(binary, cycles, patches=()):
+    system = System()
+    system.load(binary)
+    for address, data in patches:
+        system.memory.load(data, address)
+    system.run(cycles)
+    cpu = system.cpu
+    return JobResult(bytes(system.char_out.buffer), cpu.pc, cpu.acc, cpu.index, cpu.tick_counter)
+
+
+def _run_shared_job(name, size, cycles, patches):
+    binary = shared_memory.SharedMemory(name)
+    try:
+        return run_job(binary.buf[:size], cycles, patches)
+    finally:
+        binary.close()
+
+
+def run_jobs(jobs, max_workers=None):
+    # Every distinct binary is copied once into a shared memory segment, so workers map it instead of
+    # unpickling a copy per job. Only the cycle budget and the (address, bytes) patches are pickled.
+    segments = {}
+    try:
+        submissions = []
+        for job in jobs:
+            binary = bytes(job.binary)
+            if binary not in segments:
+                segment = shared_memory.SharedMemory(create=True, size=max(len(binary), 1))
+                segment.buf[:len(binary)] = binary
+                segments[binary] = segment
+            submissions.append((segments[binary].name, len(binary), job.cycles, list(job.patches)))
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(_run_shared_job, *submission) for submission in submissions]
+            return [future.result() for future in futures]
+    finally:
+        for segment in segments.values():
+            segment.close()
+            segment.unlink()
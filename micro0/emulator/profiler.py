@@ -0,0 +1,142 @@
+from array import array
+
+from micro0.emulator.computer import CYCLES
+
+SHADES = " .:-=+*#%@"
+EMPTY_PAGE = array("Q", bytes(8 * 0x100))
+
+
+def _counters(size):
+    return array("Q", bytes(8 * size))
+
+
+class Profiler:
+    # Counts executed instructions and cycles per pc and per opcode, and bus reads and writes per address.
+    # Instruction fetches count as reads of the three instruction bytes. Attach it with cpu.attach().
+    # Interpreted instructions only bump a count per pc for their opcode, plus the data address they
+    # accessed, and translated blocks only bump one hit counter each; the other counters are brought up
+    # to date from those whenever they are read.
+    def __init__(self):
+        self._instructions = _counters(0x10000)
+        self._cycles = _counters(0x10000)
+        self._opcode_instructions = _counters(0x100)
+        self._opcode_cycles = _counters(0x100)
+        self._reads = _counters(0x10000)
+        self._writes = _counters(0x10000)
+        self._executed = [_counters(0x10000) if opcode in CYCLES else None for opcode in range(0x100)]
+        self.blocks = []
+        self.instruction = self._observer()
+
+    def _increments(self, pc, opcode):
+        cycles = CYCLES[opcode]
+        return [(self._instructions, pc, 1), (self._cycles, pc, cycles),
+                (self._opcode_instructions, opcode, 1), (self._opcode_cycles, opcode, cycles),
+                (self._reads, pc, 1), (self._reads, pc + 1, 1), (self._reads, pc + 2, 1)]
+
+    def _observer(self):
+        # The per-instruction callback, with every counter it touches bound in its closure.
+        executed = self._executed
+        reads = self._reads
+        writes = self._writes
+
+        def instruction(cpu, pc, instruction):
+            executed[instruction.opcode][pc] += 1
+            if instruction.reads:
+                reads[cpu.index] += 1
+            elif instruction.writes:
+                writes[cpu.index] += 1
+
+        return instruction
+
+    def translate(self, instructions):
+        hits = _counters(1)
+        increments = []
+        for address, instruction, operand in instructions:
+            increments += self._increments(address, instruction.opcode)
+            if instruction.reads:
+                increments.append((self._reads, operand, 1))
+            elif instruction.writes:
+                increments.append((self._writes, operand, 1))
+        self.blocks.append((hits, increments))
+        name = f"profiler_{id(self):x}_{len(self.blocks)}"
+        return [f"{name}[0] += 1"], {name: hits}
+
+    def fold(self):
+        for opcode, executed in enumerate(self._executed):
+            if executed is None:
+                continue
+            for start in range(0, 0x10000, 0x100):
+                if executed[start:start + 0x100] == EMPTY_PAGE:
+                    continue
+                for pc in range(start, start + 0x100):
+                    count = executed[pc]
+                    if count:
+                        executed[pc] = 0
+                        for counters, index, increment in self._increments(pc, opcode):
+                            counters[index] += count * increment
+        for hits, increments in self.blocks:
+            count = hits[0]
+            if count:
+                hits[0] = 0
+                for counters, index, increment in increments:
+                    counters[index] += count * increment
+
+    @property
+    def instructions(self):
+        self.fold()
+        return self._instructions
+
+    @property
+    def cycles(self):
+        self.fold()
+        return self._cycles
+
+    @property
+    def opcode_instructions(self):
+        self.fold()
+        return self._opcode_instructions
+
+    @property
+    def opcode_cycles(self):
+        self.fold()
+        return self._opcode_cycles
+
+    @property
+    def reads(self):
+        self.fold()
+        return self._reads
+
+    @property
+    def writes(self):
+        self.fold()
+        return self._writes
+
+    def hotspots(self, count=10):
+        cycles = self.cycles
+        instructions = self.instructions
+        pcs = [pc for pc in range(0x10000) if cycles[pc]]
+        pcs.sort(key=lambda pc: (-cycles[pc], pc))
+        return [(pc, instructions[pc], cycles[pc]) for pc in pcs[:count]]
+
+    def report(self, count=10):
+        total = sum(self.cycles) or 1
+        lines = ["    pc   instructions        cycles      %"]
+        for pc, instructions, cycles in self.hotspots(count):
+            lines.append(f"{pc:#06x} {instructions:14d} {cycles:13d} {100 * cycles / total:6.2f}")
+        return "\n".join(lines)
+
+    def heatmap(self, counters=None):
+        # Totals per 256 byte page, in page order.
+        counters = self.reads if counters is None else counters
+        return [sum(counters[page << 8:(page + 1) << 8]) for page in range(0x100)]
+
+    def heatmap_text(self, counters=None):
+        # A 16 x 16 grid with one character per page, row 0 holding pages 0x00-0x0f.
+        pages = self.heatmap(counters)
+        peak = max(pages) or 1
+        rows = []
+        for row in range(0x10):
+            cells = pages[row << 4:(row + 1) << 4]
+            shades = "".join(SHADES[(len(SHADES) - 1) * count // peak] if count else " " for count in cells)
+            rows.append(f"{row << 12:#06x} |{shades}|")
+        return "\n".join(rows)
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+
+
+class ListSink:
+    def __init__(self):
+        self.buffer = []
+
+    def write(self, value):
+        self.buffer.append(value)
+
+    def getvalue(self):
+        return bytes(self.buffer)
+
+    def snapshot(self):
+        return list(self.buffer)
+
+    def restore(self, state):
+        self.buffer[:] = state
+
+    def fork(self):
+        return ListSink()
+
+
+class RingBufferSink:
+    # Keeps only the last size bytes that were written.
+    def __init__(self, size):
+        self.size = size
+        self.data = bytearray(size)
+        self.position = 0
+        self.written = 0
+
+    def write(self, value):
+        self.data[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.written += 1
+
+    def getvalue(self):
+        if self.written < self.size:
+            return bytes(self.data[:self.position])
+        return bytes(self.data[self.position:] + self.data[:self.position])
+
+    def snapshot(self):
+        return bytes(self.data), self.position, self.written
+
+    def restore(self, state):
+        data, self.position, self.written = state
+        self.data[:] = data
+
+    def fork(self):
+        return RingBufferSink(self.size)
+
+
+class FileSink:
+    # Collects output and hands it to a binary file object in chunks of flush_threshold bytes.
+    # Output that has been streamed out cannot be taken back, so snapshots do not include it and forks
+    # collect their own output in a ListSink.
+    def __init__(self, file, flush_threshold=4096):
+        self.file = file
+        self.flush_threshold = flush_threshold
+        self.pending = bytearray()
+        self.written = 0
+
+    def write(self, value):
+        self.pending.append(value)
+        if len(self.pending) >= self.flush_threshold:
+            self.flush()
+
+    def flush(self):
+        self.file.write(bytes(self.pending))
+        self.written += len(self.pending)
+        self.pending.clear()
+
+    def close(self):
+        self.flush()
+
+    def snapshot(self):
+        return None
+
+    def fork(self):
+        return ListSink()
+
+
+class StreamSink:
+    # Lets consumers follow the output while the machine runs, either by iterating over it from another
+    # thread or with async for. Both yield chunks of bytes and end once the sink is closed.
+    # At most max_pending bytes wait for consumers. The machine never waits for them: once that many are
+    # waiting, further output is dropped and counted in dropped until a consumer catches up.
+    # Snapshots and forks are handled as for FileSink.
+    def __init__(self, max_pending=1 << 20):
+        self.max_pending = max_pending
+        self.pending = bytearray()
+        self.dropped = 0
+        self.closed = False
+        self.listeners = []
+        # Guards pending and listeners, which the machine and the consumers' threads share.
+        self.lock = threading.Lock()
+
+    def write(self, value):
+        with self.lock:
+            if len(self.pending) < self.max_pending:
+                self.pending.append(value)
+            else:
+                self.dropped += 1
+        if self.listeners:
+            self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def read(self):
+        with self.lock:
+            chunk = bytes(self.pending)
+            self.pending.clear()
+        return chunk
+
+    def _listen(self, listener):
+        # Returns True if there is nothing to read yet, so the caller should wait for the listener to be called.
+        with self.lock:
+            self.listeners.append(listener)
+            return not self.pending and not self.closed
+
+    def _wake(self):
+        with self.lock:
+            listeners, self.listeners = self.listeners, []
+        for listener in listeners:
+            listener()
+
+    def __iter__(self):
+        while True:
+            event = threading.Event()
+            if self._listen(event.set):
+                event.wait()
+            if self.pending:
+                yield self.read()
+            elif self.closed:
+                return
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+
+            def listener(future=future):
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+            if self._listen(listener):
+                await future
+            if self.pending:
+                yield self.read()
+            elif self.closed:
+                return
+
+    def snapshot(self):
+        return None
+
+    def fork(self):
+        return ListSink()
@@ -0,0 +1,100 @@
+import unittest
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.breakpoints import Stop
+from micro0.emulator.computer import System
+
+SOURCE = """
+            .org 0x0
+            load [zero]
+            store [index]
+repeat:     load [index]
+            store [0x000D]
+i:          load [0x1000]
+            brz [finished]
+            store [0xf000]
+            load [index]
+            add [one]
+            store [index]
+            load [zero]
+            brz [repeat]
+finished:   brz [finished]
+
+            .org 0x1000
+string:     db 0x48
+            db 0x69
+            db 0x21
+            db 0x00
+zero:       db 0x00
+one:        db 0x01
+index:      db 0x00
+"""
+
+
+class TestRunUntil(unittest.TestCase):
+    def systems(self):
+        binary = Assembler().assemble(SOURCE)
+        for translate in (False, True):
+            system = System(translate)
+            system.load(binary)
+            yield system
+
+    def test_breakpoint(self):
+        for system in self.systems():
+            self.assertEqual(Stop(Stop.BREAKPOINT, 20, 0x000c), system.run_until(1000, breakpoints=[0x000c]))
+            self.assertEqual(0x000c, system.cpu.pc)
+            self.assertEqual(Stop(Stop.BREAKPOINT, 51, 0x000c), system.run_until(1000, breakpoints=[0x000c]))
+            self.assertEqual([0x48], system.char_out.buffer)
+
+    def test_output(self):
+        for system in self.systems():
+            stop = system.run_until(1000, output=(0xf000, 2))
+            self.assertEqual(Stop.OUTPUT, stop.reason)
+            self.assertEqual([0x48, 0x69], system.char_out.buffer)
+            self.assertEqual(0x0015, system.cpu.pc)
+
+    def test_read_watch(self):
+        for system in self.systems():
+            stop = system.run_until(1000, reads=[(0x1002, 0x1003)])
+            self.assertEqual(Stop(Stop.READ, 127, 0x1002), stop)
+            self.assertEqual(0x21, system.cpu.acc)
+            self.assertEqual(0x000f, system.cpu.pc)
+
+    def test_write_watch(self):
+        for system in self.systems():
+            self.assertEqual(Stop(Stop.WRITE, 10, 0x1006), system.run_until(1000, writes=[(0x1006, 0x1007)]))
+            self.assertEqual(0x0006, system.cpu.pc)
+
+    def test_max_cycles(self):
+        for system in self.systems():
+            self.assertEqual(Stop(Stop.CYCLES, 33), system.run_until(33, breakpoints=[0x0024]))
+            self.assertEqual(3, system.cpu.tick_counter)
+
+    def test_halted(self):
+        for system in self.systems():
+            stop = system.run_until(100000, writes=[(0x2000, 0x2001)])
+            self.assertEqual(Stop.HALTED, stop.reason)
+            self.assertEqual("Hi!", "".join(chr(c) for c in system.char_out.buffer))
+
+    def test_no_conditions(self):
+        for system in self.systems():
+            stop = system.run_until(100000)
+            self.assertEqual(Stop.HALTED, stop.reason)
+            self.assertEqual(0x0024, system.cpu.pc)
+
+    def test_resume_matches_run(self):
+        binary = Assembler().assemble(SOURCE)
+        reference = System()
+        reference.load(binary)
+        reference.run(500)
+        for system in self.systems():
+            remaining = 500
+            while remaining:
+                remaining -= system.run_until(remaining, breakpoints=[0x0006, 0x0012], reads=[(0x1000, 0x1004)]).cycles
+            self.assertEqual(reference.char_out.buffer, system.char_out.buffer)
+            self.assertEqual((reference.cpu.pc, reference.cpu.acc, reference.cpu.tick_counter),
+                             (system.cpu.pc, system.cpu.acc, system.cpu.tick_counter))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from micro0.emulator.computer import Memory, Bus, CharacterOutput
+
+
+class TestBus(unittest.TestCase):
+    def test_implicit_sizes(self):
+        memory = Memory(0x0000, [0x11] * 0x100)
+        char_out = CharacterOutput(0xf000)
+        bus = Bus([char_out, memory])
+        self.assertEqual([(0x0000, 0xf000, memory), (0xf000, 0x10000, char_out)], bus.regions())
+        self.assertIs(memory, bus.device(0xefff))
+        self.assertIs(char_out, bus.device(0xffff))
+
+    def test_read_write(self):
+        memory = Memory(0x0000, [0x00] * 0x10)
+        char_out = CharacterOutput(0xf000)
+        bus = Bus([memory, char_out])
+        bus.write(0x0003, 0x42)
+        bus.write(0xf0ff, 0x43)
+        self.assertEqual(0x42, bus.read(0x0003))
+        self.assertEqual([0x43], char_out.buffer)
+
+    def test_register_with_size(self):
+        bus = Bus([])
+        char_out = CharacterOutput(0xf000)
+        bus.register(char_out, 0x100)
+        self.assertIs(char_out, bus.device(0xf0ff))
+        self.assertIsNone(bus.read(0xf100))
+        bus.write(0xf100, 0x01)
+        self.assertEqual([], char_out.buffer)
+
+    def test_overlap(self):
+        bus = Bus([])
+        bus.register(Memory(0x0000, []), 0x1000)
+        with self.assertRaises(ValueError):
+            bus.register(CharacterOutput(0x0f00), 0x100)
+        self.assertEqual(1, len(bus.devices))
+
+    def test_same_offset(self):
+        with self.assertRaises(ValueError):
+            Bus([Memory(0x0000), CharacterOutput(0x0000)])
+        bus = Bus([CharacterOutput(0xf000)])
+        with self.assertRaises(ValueError):
+            bus.register(CharacterOutput(0xf000))
+        with self.assertRaises(ValueError):
+            bus.register(CharacterOutput(0xe000), 0)
+        self.assertEqual(1, len(bus.devices))
+
+    def test_alignment(self):
+        bus = Bus([])
+        with self.assertRaises(ValueError):
+            bus.register(CharacterOutput(0xf080), 0x100)
+
+    def test_write_observers(self):
+        bus = Bus([Memory(0x0000, [0x00] * 0x10)])
+        writes = []
+        bus.write_observers.append(lambda offset, value: writes.append((offset, value)))
+        bus.write(0x0004, 0x01)
+        self.assertEqual([(0x0004, 0x01)], writes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from micro0.emulator.computer import Memory, Cpu, Bus
+from micro0.emulator.computer import Memory, Cpu, Bus, IllegalOpcode
 
 
 class TestCpu(unittest.TestCase):
@@ -50,6 +50,69 @@ class TestCpu(unittest.TestCase):
         cpu.tick(5)
         self.assertEqual(0x000f, cpu.pc)
 
+    def test_step(self):
+        memory = Memory(0, [0x01, 0x09, 0x00, 0x03, 0x09, 0x00, 0x04, 0x00, 0x00, 0x21])
+        bus = Bus([memory])
+        cpu = Cpu(bus)
+        self.assertEqual(5, cpu.step())
+        self.assertEqual(0x21, cpu.acc)
+        self.assertEqual(6, cpu.step())
+        self.assertEqual(0x42, cpu.acc)
+        self.assertEqual(0x0006, cpu.pc)
+
+    def test_step_finishes_partial_instruction(self):
+        memory = Memory(0, [0x03, 0x03, 0x00, 0x13])
+        bus = Bus([memory])
+        cpu = Cpu(bus)
+        cpu.tick(2)
+        self.assertEqual(4, cpu.step())
+        self.assertEqual(0x13, cpu.acc)
+        self.assertEqual(0, cpu.tick_counter)
+
+    def test_run_instructions(self):
+        memory = Memory(0, [0x03, 0x06, 0x00, 0x04, 0x00, 0x00, 0x01])
+        bus = Bus([memory])
+        cpu = Cpu(bus)
+        cpu.acc = 0xff
+        self.assertEqual(11, cpu.run_instructions(2))
+        self.assertEqual(0x0000, cpu.pc)
+
+    def test_run_matches_tick(self):
+        contents = [0x01, 0x15, 0x00, 0x03, 0x16, 0x00, 0x02, 0x15, 0x00, 0x04, 0x12, 0x00,
+                    0x01, 0x17, 0x00, 0x04, 0x00, 0x00, 0x04, 0x12, 0x00, 0xfc, 0x01, 0x00]
+        for cycles in range(200):
+            reference = Cpu(Bus([Memory(0, contents[:])]))
+            reference.tick(cycles)
+            cpu = Cpu(Bus([Memory(0, contents[:])]))
+            cpu.run(cycles)
+            self.assertEqual((reference.pc, reference.acc, reference.index, reference.tick_counter),
+                             (cpu.pc, cpu.acc, cpu.index, cpu.tick_counter))
+
+    def test_dispatch_table(self):
+        cpu = Cpu(Bus([Memory(0, [])]))
+        self.assertEqual(0x100, len(cpu.instructions))
+        self.assertEqual([5, 5, 6, 5], [cpu.instructions[opcode].cycles for opcode in (0x01, 0x02, 0x03, 0x04)])
+        with self.assertRaises(AttributeError):
+            cpu.carry = 1
+
+    def test_illegal_opcode(self):
+        contents = [0x01, 0x06, 0x00, 0x07, 0x00, 0x00, 0x2a]
+        for run in (lambda cpu: cpu.tick(12), lambda cpu: cpu.run(12), lambda cpu: cpu.run_instructions(2)):
+            cpu = Cpu(Bus([Memory(0, contents[:])]))
+            with self.assertRaises(IllegalOpcode) as context:
+                run(cpu)
+            self.assertEqual((0x07, 0x0003), (context.exception.opcode, context.exception.pc))
+            self.assertEqual((0x0003, 0x2a, 0), (cpu.pc, cpu.acc, cpu.tick_counter))
+
+    def test_illegal_opcode_traps_on_third_tick(self):
+        contents = [0x01, 0x06, 0x00, 0x07, 0x00, 0x00, 0x2a]
+        for run in (lambda cpu: cpu.tick(7), lambda cpu: cpu.run(7)):
+            cpu = Cpu(Bus([Memory(0, contents[:])]))
+            run(cpu)
+            self.assertEqual((0x0003, 2), (cpu.pc, cpu.tick_counter))
+            with self.assertRaises(IllegalOpcode):
+                run(cpu)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+import io
+import time
+import unittest
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.computer import System
+from micro0.emulator.display import Display, TextRenderer, TerminalRenderer, RenderLoop
+
+HELLO = """
+            .org 0x0
+            load [h]
+            store [0xf828]  /* Row 1, column 0 */
+            load [i]
+            store [0xf829]
+            load [zero]
+finished:   brz [finished]
+
+            .org 0x1000
+h:          db 0x48
+i:          db 0x69
+zero:       db 0x00
+"""
+
+
+class TestDisplay(unittest.TestCase):
+    def test_dirty_rows(self):
+        display = Display(0xf800, columns=4, rows=3)
+        self.assertEqual([0, 1, 2], display.take_dirty())
+        self.assertEqual([], display.take_dirty())
+        display.write(0xf805, ord("x"))
+        display.write(0xf80b, ord("y"))
+        self.assertEqual([1, 2], display.take_dirty())
+        display.write(0xf805, ord("x"))
+        self.assertEqual([], display.take_dirty())
+        self.assertEqual(b" x  ", display.row(1))
+
+    def test_out_of_range(self):
+        display = Display(0xf800, columns=4, rows=3)
+        display.take_dirty()
+        display.write(0xf80c, ord("x"))
+        self.assertEqual([], display.take_dirty())
+        self.assertEqual(0, display.read(0xf80c))
+
+    def test_text_renderer(self):
+        system = System()
+        system.load(Assembler().assemble(HELLO))
+        renderer = TextRenderer(system.display)
+        renderer.refresh()
+        system.run(100)
+        self.assertEqual([1], renderer.refresh())
+        self.assertEqual("\nHi", renderer.text())
+
+    def test_terminal_renderer(self):
+        display = Display(0xf800, columns=4, rows=3)
+        stream = io.StringIO()
+        renderer = TerminalRenderer(display, stream)
+        renderer.refresh()
+        stream.seek(0)
+        stream.truncate()
+        display.write(0xf808, ord("z"))
+        renderer.refresh()
+        self.assertEqual("\x1b[3;1Hz   ", stream.getvalue())
+
+    def test_render_loop(self):
+        system = System()
+        system.load(Assembler().assemble(HELLO))
+        renderer = TextRenderer(system.display)
+        loop = RenderLoop(renderer, rate=200)
+        loop.start()
+        system.run(100)
+        time.sleep(0.02)
+        loop.stop()
+        self.assertEqual("\nHi", renderer.text())
+
+    def test_snapshot(self):
+        system = System()
+        system.load(Assembler().assemble(HELLO))
+        snapshot = system.snapshot()
+        system.run(100)
+        system.restore(snapshot)
+        self.assertEqual(b" " * 40, system.display.row(1))
+        self.assertEqual(list(range(25)), system.display.take_dirty())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import asyncio
+import unittest
+
+from micro0.emulator.breakpoints import Stop
+from micro0.emulator.events import EventQueue
+from micro0.test_programs import make_system
+
+TICKER = """
+            .org 0x0
+            load [one]
+            store [0xf201]  /* Enable the timer interrupt */
+idle:       wait
+            load [0xf200]   /* Acknowledge */
+            store [0xf000]
+            load [zero]
+            brz [idle]
+
+            .org 0x1000
+zero:       db 0x00
+one:        db 0x01
+"""
+
+STARTS_TIMER = """
+            .org 0x0
+            load [period]
+            store [0xf202]
+            load [zero]
+            store [0xf203]
+            load [start]
+            store [0xf201]  /* Enable the interrupt and start the timer */
+idle:       wait
+            load [0xf200]
+            store [0xf000]
+            load [zero]
+            brz [idle]
+
+            .org 0x1000
+zero:       db 0x00
+start:      db 0x03
+period:     db 0x64
+"""
+
+ECHO = """
+            .org 0x0
+idle:       wait
+            load [0xf101]
+            store [0xf000]
+            load [zero]
+            brz [idle]
+
+            .org 0x1000
+zero:       db 0x00
+"""
+
+
+class TestEventQueue(unittest.TestCase):
+    def test_order(self):
+        events = EventQueue()
+        fired = []
+        events.schedule(20, lambda cycle: fired.append(("b", cycle)))
+        events.schedule(10, lambda cycle: fired.append(("a", cycle)))
+        cancelled = events.schedule(10, lambda cycle: fired.append(("x", cycle)))
+        events.schedule(20, lambda cycle: fired.append(("c", cycle)))
+        events.cancel(cancelled)
+        self.assertEqual(10, events.next())
+        events.now = 15
+        events.advance()
+        self.assertEqual([("a", 10)], fired)
+        events.now = 20
+        events.advance()
+        self.assertEqual([("a", 10), ("b", 20), ("c", 20)], fired)
+        self.assertIsNone(events.next())
+        self.assertFalse(events)
+
+
+class TestTimer(unittest.TestCase):
+    def test_ticks(self):
+        for translate in (False, True):
+            system = make_system(TICKER, translate)
+            system.timer.start(1000)
+            self.assertEqual(10500, system.run(10500))
+            self.assertEqual([1] * 10, system.char_out.buffer)
+            self.assertEqual(10500, system.cycle)
+            self.assertFalse(system.halted)
+
+    def test_split_runs_match(self):
+        system = make_system(TICKER, True)
+        system.timer.start(1000)
+        system.run(10500)
+        split = make_system(TICKER, True)
+        split.timer.start(1000)
+        for _ in range(10500 // 7):
+            split.run(7)
+        self.assertEqual(system.char_out.buffer, split.char_out.buffer)
+        self.assertEqual((system.cpu.pc, system.cpu.acc, system.cpu.tick_counter),
+                         (split.cpu.pc, split.cpu.acc, split.cpu.tick_counter))
+
+    def test_idle_cycles_are_skipped(self):
+        system = make_system(TICKER, True)
+        system.timer.start(100000)
+        system.run(10 ** 9 + 15)
+        self.assertEqual(10 ** 4, len(system.char_out.buffer))
+
+    def test_halted_without_events(self):
+        system = make_system(TICKER, True)
+        self.assertEqual(15, system.run(10 ** 6, stop_on_halt=True))
+        self.assertTrue(system.halted)
+        system.timer.start(50)
+        self.assertFalse(system.halted)
+        self.assertEqual(1000, system.run(1000, stop_on_halt=True))
+
+    def test_guest_period(self):
+        system = make_system(TICKER, True)
+        system.timer.start(1000)
+        system.run(100)
+        system.bus.write(0xf203, 0x02)  # 0x0200 cycles from the next expiry on
+        system.bus.write(0xf202, 0x00)
+        system.run(1000 + 3 * 0x200 + 15 - 100)
+        self.assertEqual(4, len(system.char_out.buffer))
+
+    def test_guest_start(self):
+        for translate in (False, True):
+            system = make_system(STARTS_TIMER, translate)
+            # Started on cycle 30, when the store ends, the timer first expires on cycle 130.
+            stop = system.run_until(10 ** 6, writes=[(0xf000, 0xf001)])
+            self.assertEqual(Stop(Stop.WRITE, 130 + 5 + 5 + 5, 0xf000), stop)
+            split = make_system(STARTS_TIMER, translate)
+            for _ in range(1000 // 7):
+                split.run(7)
+            system.run(1000 - system.cycle - 1000 % 7)
+            self.assertEqual([1] * 9, split.char_out.buffer)
+            self.assertEqual(system.char_out.buffer, split.char_out.buffer)
+            self.assertEqual(system.cycle, split.cycle)
+
+    def test_run_until(self):
+        system = make_system(TICKER, True)
+        system.timer.start(1000)
+        stop = system.run_until(10 ** 6, writes=[(0xf000, 0xf001)])
+        self.assertEqual("write", stop.reason)
+        # The wait that ends on cycle 1000 just misses the interrupt, the next one takes it.
+        self.assertEqual(1000 + 5 + 5 + 5, stop.cycles)
+        self.assertEqual([1], system.char_out.buffer)
+
+    def test_snapshot(self):
+        system = make_system(TICKER, True)
+        system.timer.start(1000)
+        system.run(500)
+        fork = system.fork()
+        system.run(2000)
+        fork.run(2000)
+        self.assertEqual([1, 1], system.char_out.buffer)
+        self.assertEqual([1, 1], fork.char_out.buffer)
+
+
+class TestScheduledInput(unittest.TestCase):
+    def test_feed_at(self):
+        system = make_system(ECHO)
+        system.keyboard.feed_at(5000, b"a")
+        system.keyboard.feed_at(9000, b"b")
+        system.run(5000)
+        self.assertEqual([], system.char_out.buffer)
+        system.run(20)
+        self.assertEqual([ord("a")], system.char_out.buffer)
+        snapshot = system.snapshot()
+        system.run(10 ** 6)
+        self.assertEqual(b"ab", bytes(system.char_out.buffer))
+        self.assertTrue(system.halted)
+        system.restore(snapshot)
+        system.run(10 ** 6)
+        self.assertEqual(b"ab", bytes(system.char_out.buffer))
+
+    def test_feed_wakes_wait(self):
+        system = make_system(ECHO)
+        system.run(1000)
+        system.keyboard.feed(b"a")
+        system.run(1000)
+        self.assertEqual([ord("a")], system.char_out.buffer)
+
+    def test_run_async_input_wakes_wait(self):
+        system = make_system(ECHO)
+        cycles = []
+
+        async def other():
+            for _ in range(100):
+                cycles.append(system.cycle)
+                await asyncio.sleep(0)
+
+        async def main():
+            input = asyncio.Queue()
+            run = asyncio.ensure_future(system.run_async(10 ** 9, slice=1000, input=input))
+            await other()
+            input.put_nowait(b"hi")
+            await other()
+            self.assertFalse(run.done())
+            run.cancel()
+
+        asyncio.run(main())
+        # The waiting guest leaves the clock alone and the loop free until input arrives. That is one interrupt
+        # for both bytes, and the guest reads one byte per interrupt.
+        self.assertEqual({5}, set(cycles[1:100]))
+        self.assertEqual({5 + 25 + 5}, set(cycles[101:]))
+        self.assertEqual(b"h", bytes(system.char_out.buffer))
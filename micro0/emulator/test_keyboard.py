@@ -0,0 +1,43 @@
+import threading
+import unittest
+
+from micro0.emulator.computer import Keyboard
+from micro0.test_programs import ECHO, make_system
+
+
+class TestKeyboard(unittest.TestCase):
+    def test_registers(self):
+        keyboard = Keyboard(0xf100, b"ab")
+        self.assertEqual(1, keyboard.read(0xf100))
+        self.assertEqual(ord("a"), keyboard.read(0xf101))
+        self.assertEqual(ord("b"), keyboard.read(0xf101))
+        self.assertEqual(0, keyboard.read(0xf100))
+        self.assertEqual(0, keyboard.read(0xf101))
+
+    def test_script(self):
+        system = make_system(ECHO)
+        system.keyboard.feed(b"Hello")
+        system.run(10000)
+        self.assertEqual(b"Hello", bytes(system.char_out.buffer))
+        self.assertFalse(system.halted)
+
+    def test_feed_while_running(self):
+        system = make_system(ECHO)
+        feeder = threading.Thread(target=lambda: [system.keyboard.feed(bytes([c])) for c in b"threads"])
+        feeder.start()
+        while len(system.char_out.buffer) < 7:
+            system.run(1000)
+        feeder.join()
+        self.assertEqual(b"threads", bytes(system.char_out.buffer))
+
+    def test_snapshot(self):
+        system = make_system(ECHO)
+        system.keyboard.feed(b"xyz")
+        snapshot = system.snapshot()
+        system.run(10000)
+        system.restore(snapshot)
+        self.assertEqual(b"xyz", bytes(system.keyboard.queue))
+
+
+if __name__ == '__main__':
+    unittest.main()
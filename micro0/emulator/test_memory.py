@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from micro0.emulator.computer import Memory
+
+
+class TestMemory(unittest.TestCase):
+    def test_size(self):
+        self.assertEqual(0x10000, len(Memory(0x0000).backing))
+        self.assertEqual(0x1000, len(Memory(0xf000).backing))
+        self.assertEqual(0x100, len(Memory(0x0000, size=0x100).backing))
+
+    def test_read_past_image(self):
+        memory = Memory(0x0000, [0x01, 0x02])
+        self.assertEqual(0x02, memory.read(0x0001))
+        self.assertEqual(0x00, memory.read(0xffff))
+
+    def test_write_wraps(self):
+        memory = Memory(0x0000)
+        memory.write(0x0010, 0x1ff)
+        self.assertEqual(0xff, memory.read(0x0010))
+
+    def test_offset(self):
+        memory = Memory(0x8000, b"\x12\x34")
+        self.assertEqual(0x34, memory.read(0x8001))
+        memory.write(0x8002, 0x56)
+        self.assertEqual(b"\x12\x34\x56", bytes(memory.view(0x8000, 0x8003)))
+
+    def test_load(self):
+        memory = Memory(0x0000)
+        memory.load(b"\xaa\xbb", 0x1000)
+        self.assertEqual(b"\x00\xaa\xbb\x00", memory.view(0x0fff, 0x1003).tobytes())
+        with self.assertRaises(ValueError):
+            memory.load(b"\x00\x00", 0xffff)
+
+    def test_view_is_live(self):
+        memory = Memory(0x0000)
+        view = memory.view(0x0100, 0x0110)
+        memory.write(0x0101, 0x7f)
+        self.assertEqual(0x7f, view[1])
+
+    def test_load_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "image.bin")
+            with open(path, "wb") as file:
+                file.write(b"\x01\x02\x03")
+            memory = Memory(0x0000)
+            self.assertEqual(3, memory.load_file(path, 0x0200))
+            self.assertEqual(0x03, memory.read(0x0202))
+
+    def test_map_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "image.bin")
+            with open(path, "wb") as file:
+                file.write(bytes([0x11]) + bytes(0xffff))
+            memory = Memory.map_file(path)
+            self.assertEqual(0x11, memory.read(0x0000))
+            state = memory.snapshot()
+            memory.write(0x0000, 0x22)
+            self.assertEqual(0x22, memory.read(0x0000))
+            with open(path, "rb") as file:
+                self.assertEqual(0x11, file.read(1)[0])
+            memory.close()
+            self.assertTrue(memory.backing.closed)
+            with self.assertRaises(ValueError):
+                state[0][0]
+
+    def test_map_short_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "image.bin")
+            with open(path, "wb") as file:
+                file.write(b"\x05\x06")
+            memory = Memory.map_file(path)
+            self.assertIsInstance(memory.backing, bytearray)
+            self.assertEqual(0x06, memory.read(0x0001))
+
+    def test_snapshot_shares_pages(self):
+        memory = Memory(0x0000, b"\x01\x02")
+        state = memory.snapshot()
+        memory.write(0x0001, 0x22)
+        self.assertEqual(0x02, state[0][1])
+        self.assertIs(state[1], memory.pages[1])
+        self.assertIsNot(state[0], memory.pages[0])
+
+    def test_restore(self):
+        memory = Memory(0x0000, b"\x01\x02")
+        state = memory.snapshot()
+        memory.write(0x0000, 0x11)
+        memory.write(0x0300, 0x33)
+        memory.restore(state)
+        self.assertEqual(0x01, memory.read(0x0000))
+        self.assertEqual(0x00, memory.read(0x0300))
+        memory.write(0x0000, 0x44)
+        memory.restore(state)
+        self.assertEqual(0x01, memory.read(0x0000))
+
+    def test_view_of_shared_pages_is_read_only(self):
+        memory = Memory(0x0000, b"\x01\x02")
+        state = memory.snapshot()
+        with self.assertRaises(TypeError):
+            memory.view(0x0000, 0x0004)[0] = 0x77
+        self.assertEqual(0x01, state[0][0])
+        memory.restore(state)
+        self.assertEqual(0x01, memory.read(0x0000))
+
+    def test_view_after_copy_on_write(self):
+        memory = Memory(0x0000, b"\x01\x02")
+        memory.snapshot()
+        memory.write(0x0100, 0x03)
+        self.assertEqual(b"\x01\x02", memory.view(0x0000, 0x0002).tobytes())
+        self.assertEqual(b"\x03", memory.view(0x0100, 0x0101).tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
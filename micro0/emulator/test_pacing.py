@@ -0,0 +1,77 @@
+import unittest
+
+from micro0.emulator.pacing import Pacer
+from micro0.test_programs import PRINTER, make_system
+
+
+class FakeClock:
+    # Every reading costs a microsecond; sleeping advances the time by exactly the requested amount.
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        self.now += 1e-6
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class SlowSystem:
+    # Emulates a host that only manages hz cycles per second.
+    def __init__(self, system, clock, hz):
+        self.system = system
+        self.fake = clock
+        self.hz = hz
+
+    def run(self, cycles, stop_on_halt=False):
+        self.fake.now += cycles / self.hz
+        return self.system.run(cycles, stop_on_halt)
+
+
+class TestPacer(unittest.TestCase):
+    def test_paced(self):
+        fake = FakeClock()
+        pacer = Pacer(make_system(PRINTER), hz=1000, clock=fake.clock, sleep=fake.sleep)
+        report = pacer.run(cycles=1000)
+        self.assertEqual(1000, report.cycles)
+        self.assertEqual(100, report.batches)
+        self.assertAlmostEqual(1.0, report.elapsed, delta=0.001)
+        self.assertAlmostEqual(1000, report.hz, delta=1)
+        self.assertLess(abs(report.drift), 0.001)
+        self.assertEqual(0.0, report.max_lag)
+
+    def test_duration(self):
+        fake = FakeClock()
+        report = Pacer(make_system(PRINTER), hz=1000, clock=fake.clock, sleep=fake.sleep).run(duration=0.5)
+        self.assertAlmostEqual(500, report.cycles, delta=10)
+
+    def test_slow_host_grows_batches(self):
+        fake = FakeClock()
+        system = SlowSystem(make_system(PRINTER), fake, 500)
+        pacer = Pacer(system, hz=1000, clock=fake.clock, sleep=fake.sleep, max_batch_factor=4)
+        report = pacer.run(cycles=1000)
+        self.assertEqual(1000, report.cycles)
+        self.assertLess(report.batches, 40)
+        self.assertAlmostEqual(1.0, report.drift, delta=0.01)
+        self.assertGreater(report.max_lag, 0.9)
+        self.assertEqual([], fake.sleeps)
+
+    def test_fast(self):
+        fake = FakeClock()
+        report = Pacer(make_system(PRINTER), clock=fake.clock, sleep=fake.sleep).run(cycles=100000)
+        self.assertEqual(100000, report.cycles)
+        self.assertEqual([], fake.sleeps)
+        self.assertEqual(0.0, report.drift)
+
+    def test_stop_on_halt(self):
+        fake = FakeClock()
+        system = make_system("""
+                    .org 0x0
+        finished:   brz [finished]
+        """)
+        report = Pacer(system, hz=1000, clock=fake.clock, sleep=fake.sleep).run(cycles=1000, stop_on_halt=True)
+        self.assertTrue(system.halted)
+        self.assertLess(report.cycles, 1000)
@@ -0,0 +1,50 @@
+import unittest
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.pool import Job, run_job, run_jobs
+
+SOURCE = """
+            .org 0x0
+            load [zero]
+            store [index]
+repeat:     load [index]
+            store [0x000D]
+i:          load [0x1000]
+            brz [finished]
+            store [0xf000]
+            load [index]
+            add [one]
+            store [index]
+            load [zero]
+            brz [repeat]
+finished:   brz [finished]
+
+            .org 0x1000
+string:     db 0x48
+            db 0x69
+            db 0x00
+            db 0x00
+zero:       db 0x00
+one:        db 0x01
+index:      db 0x00
+"""
+
+
+class TestPool(unittest.TestCase):
+    def test_run_job(self):
+        result = run_job(Assembler().assemble(SOURCE), 1000)
+        self.assertEqual(b"Hi", result.output)
+        self.assertEqual(0x0024, result.pc)
+
+    def test_run_jobs(self):
+        binary = Assembler().assemble(SOURCE)
+        jobs = [Job(binary, 1000), Job(binary, 1000, [(0x1000, b"Yo!")]), Job(binary, 30)]
+        results = run_jobs(jobs, max_workers=2)
+        self.assertEqual([b"Hi", b"Yo!", b""], [result.output for result in results])
+        self.assertEqual([(result.pc, result.acc, result.index, result.tick_counter) for result in results],
+                         [(r.pc, r.acc, r.index, r.tick_counter) for r in (run_job(job.binary, job.cycles, job.patches)
+                                                                          for job in jobs)])
+
+
+if __name__ == '__main__':
+    unittest.main()
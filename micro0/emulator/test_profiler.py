@@ -0,0 +1,82 @@
+import unittest
+
+from micro0.emulator.profiler import Profiler
+from micro0.test_programs import COUNTER, make_system
+
+
+class TestProfiler(unittest.TestCase):
+    def profiled_system(self, translate=True):
+        system = make_system(COUNTER, translate)
+        profiler = Profiler()
+        system.cpu.attach(profiler)
+        return system, profiler
+
+    def test_counts(self):
+        for translate in (False, True):
+            self.check_counts(*self.profiled_system(translate))
+
+    def check_counts(self, system, profiler):
+        executed = system.run(3 * 31 - 10 + 5 * 5)
+        self.assertEqual(108, executed)
+        self.assertEqual(3, profiler.instructions[0x0000])
+        self.assertEqual(18, profiler.cycles[0x0003])
+        self.assertEqual(2, profiler.instructions[0x000c])
+        self.assertEqual(5, profiler.instructions[0x0012])
+        self.assertEqual(3, profiler.writes[0x1000])
+        self.assertEqual(3 + 3, profiler.reads[0x1001] + profiler.reads[0x1000])
+        self.assertEqual(3, profiler.opcode_instructions[0x03])
+        self.assertEqual(108, sum(profiler.opcode_cycles))
+        self.assertEqual(0x00, system.memory.read(0x1000))
+
+    def test_same_result_as_plain_run(self):
+        for translate in (False, True):
+            system, profiler = self.profiled_system(translate)
+            reference = make_system(COUNTER)
+            for cycles in (7, 50, 131):
+                system.run(cycles)
+                reference.run(cycles)
+                self.assertEqual((reference.cpu.pc, reference.cpu.acc, reference.cpu.tick_counter),
+                                 (system.cpu.pc, system.cpu.acc, system.cpu.tick_counter))
+            self.assertEqual(188 - system.cpu.tick_counter, sum(profiler.cycles))
+
+    def test_interpreted_observer(self):
+        class Recorder:
+            def __init__(self):
+                self.pcs = []
+
+            def instruction(self, cpu, pc, instruction):
+                self.pcs.append(pc)
+
+        system = make_system(COUNTER)
+        recorder = Recorder()
+        system.cpu.attach(recorder)
+        system.run(31)
+        self.assertEqual([0x0000, 0x0003, 0x0006, 0x0009, 0x000c, 0x000f], recorder.pcs)
+
+    def test_hotspots(self):
+        system, profiler = self.profiled_system()
+        system.run(1000)
+        hotspots = profiler.hotspots(2)
+        self.assertEqual(0x0012, hotspots[0][0])
+        self.assertEqual(sum(profiler.cycles), 1000 - system.cpu.tick_counter)
+        self.assertIn("0x0012", profiler.report())
+
+    def test_heatmap(self):
+        system, profiler = self.profiled_system()
+        system.run(1000)
+        pages = profiler.heatmap(profiler.writes)
+        self.assertEqual(3, pages[0x10])
+        self.assertEqual(3, sum(pages))
+        text = profiler.heatmap_text(profiler.writes)
+        self.assertEqual(16, len(text.splitlines()))
+        self.assertEqual("0x1000 |@               |", text.splitlines()[1])
+
+    def test_detach(self):
+        system, profiler = self.profiled_system()
+        system.cpu.detach(profiler)
+        system.run(1000)
+        self.assertEqual(0, sum(profiler.instructions))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import io
+import threading
+import unittest
+
+from micro0.emulator.sinks import ListSink, RingBufferSink, FileSink, StreamSink
+from micro0.test_programs import PRINTER, make_system
+
+ITERATION = 31
+
+
+class TestSinks(unittest.TestCase):
+    def test_list(self):
+        system = make_system(PRINTER, sink=ListSink())
+        system.run(3 * ITERATION)
+        self.assertEqual([1, 2, 3], system.char_out.buffer)
+        self.assertEqual(b"\x01\x02\x03", system.char_out.sink.getvalue())
+
+    def test_ring_buffer(self):
+        sink = RingBufferSink(4)
+        system = make_system(PRINTER, sink=sink)
+        system.run(3 * ITERATION)
+        self.assertEqual(b"\x01\x02\x03", sink.getvalue())
+        system.run(3 * ITERATION)
+        self.assertEqual(b"\x03\x04\x05\x06", sink.getvalue())
+        self.assertEqual(6, sink.written)
+        self.assertIsNone(system.char_out.buffer)
+
+    def test_ring_buffer_snapshot(self):
+        system = make_system(PRINTER, sink=RingBufferSink(4))
+        system.run(5 * ITERATION)
+        snapshot = system.snapshot()
+        fork = system.fork()
+        system.run(2 * ITERATION)
+        system.restore(snapshot)
+        self.assertEqual(b"\x02\x03\x04\x05", system.char_out.sink.getvalue())
+        self.assertEqual(b"\x02\x03\x04\x05", fork.char_out.sink.getvalue())
+
+    def test_file(self):
+        file = io.BytesIO()
+        sink = FileSink(file, flush_threshold=4)
+        system = make_system(PRINTER, sink=sink)
+        system.run(6 * ITERATION)
+        self.assertEqual(b"\x01\x02\x03\x04", file.getvalue())
+        sink.close()
+        self.assertEqual(b"\x01\x02\x03\x04\x05\x06", file.getvalue())
+        self.assertEqual(6, sink.written)
+
+    def test_stream(self):
+        sink = StreamSink()
+        system = make_system(PRINTER, sink=sink)
+        received = bytearray()
+
+        def consume():
+            for chunk in sink:
+                received.extend(chunk)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for _ in range(10):
+            system.run(10 * ITERATION)
+        sink.close()
+        consumer.join(timeout=10)
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(bytes(range(1, 101)), bytes(received))
+
+    def test_stream_drops_when_full(self):
+        sink = StreamSink(max_pending=4)
+        system = make_system(PRINTER, sink=sink)
+        system.run(6 * ITERATION)
+        self.assertEqual(b"\x01\x02\x03\x04", sink.read())
+        self.assertEqual(2, sink.dropped)
+        system.run(ITERATION)
+        self.assertEqual(b"\x07", sink.read())
+
+    def test_stream_async(self):
+        sink = StreamSink()
+        system = make_system(PRINTER, sink=sink)
+
+        async def produce():
+            for _ in range(10):
+                system.run(10 * ITERATION)
+                await asyncio.sleep(0)
+            sink.close()
+
+        async def consume():
+            received = bytearray()
+            async for chunk in sink:
+                received.extend(chunk)
+            return bytes(received)
+
+        async def main():
+            received, _ = await asyncio.gather(consume(), produce())
+            return received
+
+        self.assertEqual(bytes(range(1, 101)), asyncio.run(main()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
+import asyncio
 import unittest
 
 from micro0.assembler.assembler import Assembler
 from micro0.emulator.computer import System
+from micro0.test_programs import ECHO, PRINTER, make_system
 
 
 class TestSystem(unittest.TestCase):
@@ -47,6 +49,179 @@ class TestSystem(unittest.TestCase):
 
         self.assertEqual("".join((chr(c) for c in system.char_out.buffer)), "Hello World!")  # add assertion here
 
+    def test_fork(self):
+        system = make_system(PRINTER)
+        system.run(31)
+        snapshot = system.snapshot()
+        fork = system.fork()
+        fork.memory.write(0x1001, 0x02)
+        fork.run(62)
+        system.run(62)
+        self.assertEqual([0x01, 0x02, 0x03], system.char_out.buffer)
+        self.assertEqual([0x01, 0x03, 0x05], fork.char_out.buffer)
+        self.assertEqual(0x01, system.memory.read(0x1001))
+
+        system.restore(snapshot)
+        self.assertEqual([0x01], system.char_out.buffer)
+        self.assertEqual(0x01, system.memory.read(0x1000))
+        self.assertEqual(0x0000, system.cpu.pc)
+        system.run(31)
+        self.assertEqual([0x01, 0x02], system.char_out.buffer)
+
+    def test_fork_shares_translations(self):
+        system = make_system(PRINTER, True)
+        system.run(31)
+        compiled = len(system.cpu.translator.code)
+        fork = system.fork()
+        self.assertIs(system.cpu.translator.code, fork.cpu.translator.code)
+        self.assertEqual(0, len(fork.memory.backing))
+        fork.memory.write(0x1001, 0x02)
+        fork.run(62)
+        self.assertEqual([0x01, 0x03, 0x05], fork.char_out.buffer)
+        self.assertEqual(compiled, len(fork.cpu.translator.code))
+
+    def test_halt(self):
+        source = """
+                    .org 0x0
+                    load [one]
+                    store [0xf000]
+        finished:   load [zero]
+                    brz [finished]
+
+                    .org 0x1000
+        zero:       db 0x00
+        one:        db 0x01
+        """
+        binary = Assembler().assemble(source)
+        for translate in (False, True):
+            system = System(translate)
+            system.load(binary)
+            self.assertEqual(1000003, system.run(1000003))
+            self.assertTrue(system.halted)
+            self.assertEqual(3, system.cpu.tick_counter)
+            self.assertEqual([0x01], system.char_out.buffer)
+
+            # The loop is known to be idle once its branch has been taken twice.
+            system = System(translate)
+            system.load(binary)
+            self.assertEqual(30, system.run(1000000, stop_on_halt=True))
+            self.assertTrue(system.halted)
+            self.assertEqual(0x0006, system.cpu.pc)
+
+    def test_polling_loop_not_halted(self):
+        system = make_system(ECHO)
+        self.assertEqual(1000, system.run(1000, stop_on_halt=True))
+        self.assertFalse(system.halted)
+
+    def test_halt_on_branch_to_self(self):
+        binary = Assembler().assemble(".org 0x0\nload [0x0100]\nfinished: brz [finished]")
+        for translate in (False, True):
+            system = System(translate)
+            system.load(binary)
+            self.assertEqual(1000002, system.run(1000002))
+            self.assertTrue(system.halted)
+            self.assertEqual(2, system.cpu.tick_counter)
+
+            system = System(translate)
+            system.load(binary)
+            self.assertEqual(10, system.run(1000000, stop_on_halt=True))
+
+    def test_not_halted(self):
+        source = """
+                    .org 0x0
+        repeat:     add [one]
+                    brz [repeat]
+                    load [zero]
+                    brz [repeat]
+
+                    .org 0x1000
+        zero:       db 0x00
+        one:        db 0x01
+        """
+        binary = Assembler().assemble(source)
+        for translate in (False, True):
+            system = System(translate)
+            system.load(binary)
+            system.cpu.acc = 0xff
+            system.run(11, stop_on_halt=True)
+            self.assertFalse(system.halted)
+            self.assertEqual(0x0000, system.cpu.pc)
+            self.assertEqual(0x00, system.cpu.acc)
+            system.run(11)
+            self.assertEqual(0x0006, system.cpu.pc)
+
+    def test_loop_entered_midway_not_halted(self):
+        # The branch back to repeat is taken with acc == 0 twice, but the second time after coming in at check.
+        source = """
+                    .org 0x0
+        repeat:     add [one]
+        check:      brz [repeat]
+                    load [zero]
+                    brz [check]
+
+                    .org 0x1000
+        zero:       db 0x00
+        one:        db 0x01
+        """
+        for translate in (False, True):
+            system = make_system(source, translate)
+            system.cpu.acc = 0xff
+            self.assertEqual(1000, system.run(1000, stop_on_halt=True))
+            self.assertFalse(system.halted)
+
+    def test_run_async(self):
+        system = make_system(PRINTER)
+        reference = make_system(PRINTER)
+        self.assertEqual(1000, asyncio.run(system.run_async(1000, slice=7)))
+        reference.run(1000)
+        self.assertEqual((reference.cpu.pc, reference.cpu.acc, reference.cpu.tick_counter),
+                         (system.cpu.pc, system.cpu.acc, system.cpu.tick_counter))
+        self.assertEqual(reference.char_out.buffer, system.char_out.buffer)
+
+    def test_run_async_shares_loop(self):
+        systems = [System() for _ in range(3)]
+        progress = []
+
+        async def watch():
+            for _ in range(5):
+                progress.append([len(system.char_out.buffer) for system in systems])
+                await asyncio.sleep(0)
+
+        async def main():
+            for system in systems:
+                system.load(Assembler().assemble(PRINTER))
+            await asyncio.gather(watch(), *(system.run_async(31 * 100, slice=31) for system in systems))
+
+        asyncio.run(main())
+        self.assertEqual([[0, 0, 0], [1, 1, 1], [2, 2, 2], [3, 3, 3], [4, 4, 4]], progress)
+        self.assertEqual([100, 100, 100], [len(system.char_out.buffer) for system in systems])
+
+    def test_run_async_cancel(self):
+        system = make_system(PRINTER)
+
+        async def main():
+            task = asyncio.create_task(system.run_async(10 ** 9, slice=100))
+            for _ in range(3):
+                await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+        self.assertEqual(0, system.cpu.tick_counter)
+        self.assertTrue(0 < len(system.char_out.buffer) < 20)
+
+    def test_run_async_input(self):
+        system = make_system(ECHO)
+
+        async def main():
+            queue = asyncio.Queue()
+            queue.put_nowait(b"hi")
+            await system.run_async(500, slice=100, input=queue)
+
+        asyncio.run(main())
+        self.assertEqual(list(b"hi"), system.char_out.buffer)
+
 
 if __name__ == '__main__':
     unittest.main()
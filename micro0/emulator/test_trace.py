@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from micro0.emulator.trace import Record, TraceReader, TraceRecorder
+from micro0.test_programs import COUNTER, make_system
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def record(self, name, cycles, source=COUNTER, chunk_records=4):
+        system = make_system(source)
+        path = os.path.join(self.directory.name, name)
+        with TraceRecorder(path, chunk_records) as recorder:
+            system.cpu.attach(recorder)
+            system.run(cycles)
+        reader = TraceReader(path)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_records(self):
+        trace = self.record("a.trace", 3 * 31)
+        self.assertEqual(18, len(trace))
+        self.assertEqual(Record(0, 0x0000, 0x01, 0xfd, 0x1000, 0xfd), trace[0])
+        self.assertEqual(Record(5, 0x0003, 0x03, 0xfe, 0x1001, 0x01), trace[1])
+        self.assertEqual(Record(11, 0x0006, 0x02, 0xfe, 0x1000, 0xfe), trace[2])
+        self.assertEqual(Record(16, 0x0009, 0x04, 0xfe, 0x0012, 0x00), trace[3])
+        self.assertEqual(31, trace[6].cycle)
+        self.assertEqual(0x0012, trace[-1].pc)
+
+    def test_seek_and_filter(self):
+        trace = self.record("a.trace", 3 * 31)
+        self.assertEqual(6, trace.seek(31))
+        self.assertEqual(7, trace.seek(32))
+        self.assertEqual(18, trace.seek(1000))
+        stores = list(trace.filter(addresses=(0x1000, 0x1001)))
+        self.assertEqual([0x01, 0x02] * 3, [record.opcode for record in stores])
+        self.assertEqual([0x0006], [record.pc for record in trace.filter(pcs=(0x0006, 0x0009), start_cycle=31,
+                                                                         end_cycle=62)])
+
+    def test_diff(self):
+        a = self.record("a.trace", 3 * 31)
+        b = self.record("b.trace", 3 * 31)
+        self.assertIsNone(a.diff(b))
+        c = self.record("c.trace", 3 * 31, COUNTER.replace("db 0xfd", "db 0xfc"))
+        index, left, right = a.diff(c, chunk_records=4)
+        self.assertEqual(0, index)
+        self.assertEqual((0xfd, 0xfc), (left.acc, right.acc))
+        d = self.record("d.trace", 2 * 31)
+        self.assertEqual((12, a[12], None), a.diff(d))
+
+    def test_system_cycles(self):
+        # Attached late, and run in slices that end inside instructions.
+        full = self.record("a.trace", 6 * 31)
+        system = make_system(COUNTER)
+        system.run(3 * 31)
+        path = os.path.join(self.directory.name, "b.trace")
+        with TraceRecorder(path, 4, system) as recorder:
+            system.cpu.attach(recorder)
+            for _ in range(31):
+                system.run(3)
+        trace = TraceReader(path)
+        self.addCleanup(trace.close)
+        self.assertEqual(3 * 31, trace[0].cycle)
+        self.assertEqual(list(full)[len(full) - len(trace):], list(trace))
+
+    def test_not_a_trace(self):
+        path = os.path.join(self.directory.name, "empty")
+        with open(path, "wb") as file:
+            file.write(b"not a trace file")
+        with self.assertRaises(ValueError):
+            TraceReader(path)
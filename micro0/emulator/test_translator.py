@@ -0,0 +1,116 @@
+import unittest
+from unittest import mock
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.computer import Memory, Cpu, Bus, CharacterOutput, LoadDirect
+from micro0.test_programs import HELLO_WORLD, MEMCPY, make_system
+
+PATCHES_OPCODE = """
+            .org 0x0
+repeat:     load [opcode]
+            store [patch]   /* Rewrites the opcode at patch with the same value */
+patch:      load [one]
+            store [0xf000]
+            load [zero]
+            brz [repeat]
+
+            .org 0x1000
+opcode:     db 0x01
+one:        db 0x01
+zero:       db 0x00
+"""
+
+
+def make_cpu(binary, translate):
+    memory = Memory(0x0000, binary)
+    char_out = CharacterOutput(0xf000)
+    cpu = Cpu(Bus([memory, char_out]), translate)
+    return cpu, memory, char_out
+
+
+class TestTranslator(unittest.TestCase):
+    def test_matches_interpreter(self):
+        for source in (HELLO_WORLD, MEMCPY):
+            binary = Assembler().assemble(source)
+            for cycles in range(0, 400, 7):
+                reference, reference_memory, reference_out = make_cpu(binary, False)
+                reference.tick(cycles)
+                cpu, memory, char_out = make_cpu(binary, True)
+                cpu.run(cycles)
+                self.assertEqual((reference.pc, reference.acc, reference.index, reference.tick_counter),
+                                 (cpu.pc, cpu.acc, cpu.index, cpu.tick_counter))
+                self.assertEqual(reference_memory.view(), memory.view())
+                self.assertEqual(reference_out.buffer, char_out.buffer)
+
+    def test_block_ends_at_branch(self):
+        cpu, memory, char_out = make_cpu(Assembler().assemble(HELLO_WORLD), True)
+        block = cpu.translator.translate(0x0012)
+        self.assertEqual(0x0012, block.start)
+        self.assertEqual(0x0024, block.end)
+        self.assertEqual(31, block.cycles)
+
+    def test_block_ends_at_timer_store(self):
+        # The timer reads the clock when it is written to, which ends the cpu run.
+        system = make_system(".org 0x0\nload [0x1000]\nstore [0xf201]\nstore [0xf000]\nload [0x1000]\nbrz [0x0000]",
+                             True)
+        self.assertEqual(0x0006, system.cpu.translator.translate(0x0000).end)
+        self.assertEqual(0x000f, system.cpu.translator.translate(0x0006).end)
+
+    def test_patched_operand_is_read_at_run_time(self):
+        # store [0x000D] patches the operand of the load at 0x000c on every pass through the loop.
+        cpu, memory, char_out = make_cpu(Assembler().assemble(HELLO_WORLD), True)
+        block = cpu.translator.translate(0x0006)
+        self.assertEqual(0x0012, block.end)
+        self.assertEqual([0x0006, 0x0007, 0x0008, 0x0009, 0x000a, 0x000b, 0x000c, 0x000f, 0x0010, 0x0011], block.owned)
+        cpu.run(1000)
+        self.assertEqual(list(b"Hello World!"), char_out.buffer)
+        self.assertEqual({}, cpu.translator.invalidations)
+        self.assertEqual(4, len(cpu.translator.code))
+
+    def test_write_invalidates_block(self):
+        cpu, memory, char_out = make_cpu([0x01, 0x09, 0x00, 0x02, 0x0a, 0x00, 0x04, 0x00, 0x00, 0x07, 0x00], True)
+        cpu.run(15)
+        self.assertIn(0x0000, cpu.translator.blocks)
+        cpu.bus.write(0x0001, 0x0a)
+        self.assertNotIn(0x0000, cpu.translator.blocks)
+        cpu.bus.write(0x000a, 0x33)
+        cpu.pc = 0
+        cpu.run(5)
+        self.assertEqual(0x33, cpu.acc)
+
+    def test_repeatedly_invalidated_block_is_interpreted(self):
+        cpu, memory, char_out = make_cpu(Assembler().assemble(PATCHES_OPCODE), True)
+        translator = cpu.translator
+        translator.max_invalidations = 2
+        cpu.run(31 * 5)
+        self.assertEqual(2, translator.invalidations[0x0006])
+        self.assertNotIn(0x0006, translator.blocks)
+        self.assertIsNone(translator.translate(0x0006))
+        self.assertEqual([0x01] * 5, char_out.buffer)
+
+    def test_load_forgets_invalidations(self):
+        system = make_system(PATCHES_OPCODE, True)
+        translator = system.cpu.translator
+        translator.max_invalidations = 2
+        system.run(31 * 5)
+        self.assertIsNone(translator.translate(0x0006))
+        system.load(Assembler().assemble(HELLO_WORLD))
+        self.assertEqual({}, translator.invalidations)
+        self.assertEqual(set(), translator.patched)
+        self.assertIsNotNone(translator.translate(0x0006))
+
+    def test_code_cache_skips_code_generation(self):
+        cpu, memory, char_out = make_cpu(Assembler().assemble(HELLO_WORLD), True)
+        block = cpu.translator.translate(0x0012)
+        cpu.translator.flush()
+        with mock.patch.object(LoadDirect, "translate", side_effect=AssertionError("lines generated again")):
+            self.assertIs(block.function, cpu.translator.translate(0x0012).function)
+
+    def test_system_hello_world(self):
+        system = make_system(HELLO_WORLD, True)
+        system.run(1000)
+        self.assertEqual("Hello World!", "".join(chr(c) for c in system.char_out.buffer))
+
+
+if __name__ == '__main__':
+    unittest.main()
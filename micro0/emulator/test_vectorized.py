@@ -0,0 +1,157 @@
+import unittest
+
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.computer import System
+
+try:
+    from micro0.emulator.vectorized import VectorSystem
+except ImportError:
+    VectorSystem = None
+
+SOURCE = """
+            .org 0x0
+            load [zero]
+            store [index]
+repeat:     load [index]
+            store [0x000D]
+i:          load [0x1000]
+            brz [finished]
+            store [0xf000]
+            load [index]
+            add [one]
+            store [index]
+            load [zero]
+            brz [repeat]
+finished:   brz [finished]
+
+            .org 0x1000
+string:     db 0x00
+            db 0x00
+            db 0x00
+            db 0x00
+            db 0x00
+zero:       db 0x00
+one:        db 0x01
+index:      db 0x00
+"""
+
+STRINGS = [b"Hi!", b"", b"abcd", b"\xff\x01", b"x"]
+
+
+@unittest.skipIf(VectorSystem is None, "numpy is not installed")
+class TestVectorSystem(unittest.TestCase):
+    def run_both(self, cycles):
+        binary = Assembler().assemble(SOURCE)
+        batch = VectorSystem(len(STRINGS))
+        batch.load(binary)
+        systems = []
+        for machine, string in enumerate(STRINGS):
+            batch.patch(machine, 0x1000, string)
+            system = System()
+            system.load(binary)
+            system.memory.load(string, 0x1000)
+            system.run(cycles)
+            systems.append(system)
+        batch.run(cycles)
+        return batch, systems
+
+    def test_matches_system(self):
+        batch, systems = self.run_both(2000)
+        for machine, system in enumerate(systems):
+            self.assertEqual(system.char_out.buffer, batch.char_out[machine].buffer)
+            self.assertEqual(list(STRINGS[machine]), batch.char_out[machine].buffer)
+            self.assertEqual((system.cpu.pc, system.cpu.acc, system.cpu.index, system.cpu.tick_counter),
+                             batch.state(machine))
+
+    def test_partial_instructions(self):
+        for cycles in range(0, 120, 7):
+            batch, systems = self.run_both(cycles)
+            for machine, system in enumerate(systems):
+                self.assertEqual((system.cpu.pc, system.cpu.acc, system.cpu.index, system.cpu.tick_counter),
+                                 batch.state(machine))
+                self.assertEqual(system.cpu.buffer, batch.buffer[machine])
+
+    def test_resume(self):
+        batch, systems = self.run_both(93)
+        batch.run(1000)
+        for machine, system in enumerate(systems):
+            system.run(1000)
+            self.assertEqual(system.char_out.buffer, batch.char_out[machine].buffer)
+            self.assertEqual((system.cpu.pc, system.cpu.acc, system.cpu.index, system.cpu.tick_counter),
+                             batch.state(machine))
+
+    def test_halted(self):
+        batch, systems = self.run_both(1000003)
+        for machine, system in enumerate(systems):
+            self.assertTrue(batch.halted[machine])
+            self.assertEqual((system.cpu.pc, system.cpu.acc, system.cpu.index, system.cpu.tick_counter),
+                             batch.state(machine))
+
+    def test_load_raw_binary(self):
+        binary = bytes(Assembler().assemble(SOURCE))
+        batch = VectorSystem(2)
+        batch.load(binary)
+        batch.load(bytearray(binary), [1])
+        for machine in range(2):
+            self.assertEqual(binary, batch.memory[machine, :len(binary)].tobytes())
+
+    def test_devices_match_system(self):
+        # Reads back the display and the timer registers, and writes past them.
+        source = """
+                    .org 0x0
+                    load [0xf800]
+                    store [0xf000]
+                    load [0xf7ff]
+                    store [0xf000]
+                    load [value]
+                    store [0xf801]
+                    store [0xfbe8]
+                    store [0xf201]
+                    store [0xf202]
+                    store [0xf200]
+                    store [0xf204]
+                    load [0xf801]
+                    store [0xf000]
+                    load [0xfbe8]
+                    store [0xf000]
+                    load [0xf200]
+                    store [0xf000]
+                    load [0xf201]
+                    store [0xf000]
+                    load [0xf202]
+                    store [0xf000]
+                    load [0xf204]
+                    store [0xf000]
+                    load [0xf101]
+                    store [0xf000]
+            end:    brz [end]
+
+                    .org 0x1000
+            value:  db 0x41
+
+                    .org 0xf800
+                    db 0x42
+        """
+        binary = Assembler().assemble(source)
+        system = System()
+        system.load(binary)
+        system.run(200)
+        batch = VectorSystem(1)
+        batch.load(binary)
+        batch.run(200)
+        self.assertEqual([0x20, 0x00, 0x41, 0x00, 0x00, 0x41, 0x41, 0x00, 0x00], system.char_out.buffer)
+        self.assertEqual(system.char_out.buffer, batch.char_out[0].buffer)
+        self.assertEqual(bytes(system.display.cells), batch.display(0))
+
+    def test_illegal_opcode(self):
+        batch = VectorSystem(2)
+        batch.load([0x01, 0x00, 0x00])
+        batch.patch(1, 0x0000, [0x07])
+        batch.run(2)
+        self.assertEqual((0, 0, 0, 2), batch.state(1))
+        with self.assertRaises(KeyError):
+            batch.run(10)
+
+
+if __name__ == '__main__':
+    unittest.main()
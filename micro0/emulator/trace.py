@@ -0,0 +1,123 @@
+import collections
+import mmap
+import struct
+
+MAGIC = b"M0TRACE2"
+RECORD = struct.Struct("<QHHBBBx")
+
+Record = collections.namedtuple("Record", "cycle pc opcode acc address value")
+
+
+class TraceRecorder:
+    # Records one fixed size record per executed instruction: the cycle it started on, its pc and opcode,
+    # acc after it ran, the address in index (the data address it accessed, or the target for brz) and
+    # the byte it moved over the bus (0 for brz).
+    # Records are packed into a preallocated chunk that is appended to the file whenever it fills up.
+    # Attach it with cpu.attach() and close it when done. Cycles are taken from System.cycle if a system is
+    # given, so they stay right however the system runs; a bare cpu's are counted from 0 by the recorder.
+    def __init__(self, path, chunk_records=0x10000, system=None):
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.chunk = bytearray(chunk_records * RECORD.size)
+        self.position = 0
+        self.system = system
+        self.cycle = 0
+        self.records = 0
+
+    def instruction(self, cpu, pc, instruction):
+        if instruction.branches:
+            value = 0
+        elif instruction.reads and instruction.opcode != 0x01:
+            # add leaves the byte it read in buffer; load and store move acc itself
+            value = cpu.buffer
+        else:
+            value = cpu.acc
+        if self.system is not None:
+            # Observers are called once the instruction is over.
+            self.cycle = self.system.cycle - instruction.cycles
+        RECORD.pack_into(self.chunk, self.position, self.cycle, pc, cpu.index, instruction.opcode, cpu.acc, value)
+        self.cycle += instruction.cycles
+        self.records += 1
+        self.position += RECORD.size
+        if self.position == len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        self.file.write(memoryview(self.chunk)[:self.position])
+        self.position = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TraceReader:
+    # Maps a trace file and reads records straight from the mapping, so traces larger than memory can be
+    # searched and compared.
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+
+    def close(self):
+        self.map.close()
+
+    def __len__(self):
+        return (len(self.map) - len(MAGIC)) // RECORD.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        cycle, pc, address, opcode, acc, value = RECORD.unpack_from(self.map, len(MAGIC) + index * RECORD.size)
+        return Record(cycle, pc, opcode, acc, address, value)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def seek(self, cycle):
+        # Index of the first record that starts on or after cycle.
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if RECORD.unpack_from(self.map, len(MAGIC) + middle * RECORD.size)[0] < cycle:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def filter(self, pcs=None, addresses=None, start_cycle=0, end_cycle=None):
+        # pcs and addresses are (start, end) ranges; records must match both to be returned.
+        for index in range(self.seek(start_cycle), len(self)):
+            record = self[index]
+            if end_cycle is not None and record.cycle >= end_cycle:
+                return
+            if pcs is not None and not pcs[0] <= record.pc < pcs[1]:
+                continue
+            if addresses is not None and not addresses[0] <= record.address < addresses[1]:
+                continue
+            yield record
+
+    def diff(self, other, chunk_records=0x1000):
+        # Returns (index, this record, other record) for the first difference, with None for a record
+        # missing from the shorter trace, or None if the traces are identical.
+        count = min(len(self), len(other))
+        step = chunk_records * RECORD.size
+        for start in range(len(MAGIC), len(MAGIC) + count * RECORD.size, step):
+            end = min(start + step, len(MAGIC) + count * RECORD.size)
+            if self.map[start:end] != other.map[start:end]:
+                for index in range((start - len(MAGIC)) // RECORD.size, (end - len(MAGIC)) // RECORD.size):
+                    if self[index] != other[index]:
+                        return index, self[index], other[index]
+        if len(self) != len(other):
+            return count, self[count] if count < len(self) else None, other[count] if count < len(other) else None
+        return None
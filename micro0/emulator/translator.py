@@ -0,0 +1,207 @@
+from micro0.emulator import computer
+
+
+class Block:
+    def __init__(self, start, end, cycles, function, last, operand, owned, watched=False):
+        self.start = start
+        self.end = end
+        self.cycles = cycles
+        self.function = function
+        self.last = last
+        # None when the last instruction's operand is read from memory as the block runs.
+        self.operand = operand
+        # The addresses whose bytes are baked into the code; a write to any of them invalidates the block.
+        self.owned = owned
+        # A watched block ends with an access that a breakpoint condition is looking for.
+        self.watched = watched
+
+
+class Translator:
+    # Translates straight-line runs of instructions, up to and including the first branch, into
+    # compiled Python functions keyed by their start address. Operands are baked into the generated
+    # code, so any bus write that lands inside a block invalidates it. Writes that patch an operand are
+    # remembered, and from then on that operand is read from memory when the block runs, the way the cpu
+    # reads it, so indexing through self-modifying code neither invalidates nor recompiles the block. A
+    # block ends after a store through such an operand, as it could land anywhere, and after a store to a
+    # device with a clock, which ends the cpu run to schedule something on that cycle. Compiled code is
+    # cached by the bytes it was generated from, and a start address whose block still keeps being
+    # invalidated, for instance because opcodes are patched, is left to the interpreter after
+    # max_invalidations times.
+    max_instructions = 32
+    max_code = 4096
+    max_invalidations = 4
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.blocks = {}
+        self.owners = {}
+        self.code = {}
+        self.invalidations = {}
+        self.patched = set()
+        self.conditions = None
+        cpu.bus.write_observers.append(self.invalidate)
+
+    def flush(self):
+        self.blocks.clear()
+        self.owners.clear()
+
+    def forget(self):
+        # For new memory contents: what was learnt about the old program no longer applies, but compiled
+        # code is still good for the same bytes.
+        self.flush()
+        self.invalidations.clear()
+        self.patched.clear()
+
+    def reset(self):
+        # The code cache may be shared with forks, so it is replaced rather than cleared.
+        self.forget()
+        self.code = {}
+
+    def watch(self, conditions):
+        # Blocks are cut so that every breakpoint starts a block and every watched access ends one.
+        self.conditions = conditions
+        self.flush()
+
+    def invalidate(self, offset, value):
+        starts = self.owners.get(offset)
+        if starts:
+            self.patched.add(offset)
+            for start in list(starts):
+                self.discard(start)
+                self.invalidations[start] = self.invalidations.get(start, 0) + 1
+
+    def discard(self, start):
+        block = self.blocks.pop(start)
+        for address in block.owned:
+            starts = self.owners[address]
+            starts.remove(start)
+            if not starts:
+                del self.owners[address]
+
+    def translate(self, pc):
+        if self.invalidations.get(pc, 0) >= self.max_invalidations:
+            return None
+        bus = self.cpu.bus
+        instructions = self.cpu.instructions
+        conditions = self.conditions
+        # Observers and watchpoints need to know every operand up front.
+        patched = self.patched if conditions is None and not self.cpu.observers else None
+        code = self._code(pc)
+        position = 0
+        key = []
+        owned = []
+        targets = set()
+        cycles = 0
+        last = None
+        operand = 0
+        translated = []
+        watched = False
+        while position + 3 <= len(code) and len(translated) < self.max_instructions:
+            address = pc + position
+            if conditions is not None and address != pc and address in conditions.breakpoints:
+                break
+            if address in targets:
+                break
+            dynamic = address + 1 in targets or address + 2 in targets
+            if dynamic and patched is None:
+                break
+            dynamic = dynamic or patched is not None and (address + 1 in patched or address + 2 in patched)
+            instruction = instructions[code[position]]
+            if not hasattr(instruction, "translate"):
+                break
+            if dynamic:
+                operand = None
+                key += [instruction.opcode, None, None]
+                owned.append(address)
+            else:
+                operand = code[position + 1] + (code[position + 2] << 8)
+                key += code[position:position + 3]
+                owned += [address, address + 1, address + 2]
+            translated.append((address, instruction, operand))
+            cycles += instruction.cycles
+            last = instruction
+            position += 3
+            if conditions is not None and conditions.watches(instruction, operand):
+                watched = True
+                break
+            if instruction.writes:
+                if dynamic or getattr(bus.device(operand), "clock", None) is not None:
+                    break
+                targets.add(operand)
+            if instruction.branches:
+                break
+        address = pc + position
+        if last is None:
+            return None
+
+        key = (pc, tuple(key))
+        function = self.code.get(key)
+        if function is None:
+            function = self._compile(pc, address, last, operand, translated)
+            if len(self.code) >= self.max_code:
+                self.code.clear()
+            self.code[key] = function
+        block = Block(pc, address, cycles, function, last, operand, owned, watched)
+        self.blocks[pc] = block
+        for a in owned:
+            self.owners.setdefault(a, set()).add(pc)
+        return block
+
+    def _compile(self, start, end, last, operand, translated):
+        # Blocks reach the bus and instructions through the cpu they are called with, so any cpu with the same
+        # observers and the same memory map can run them. Reads from memory index straight into its pages.
+        memories = {}
+
+        def read(address):
+            if isinstance(address, str):
+                return f"read({address})"
+            device = self.cpu.bus.device(address)
+            if not isinstance(device, computer.Memory):
+                return f"read({address:#06x})"
+            name = memories.setdefault(id(device), (f"memory_{len(memories)}", address))[0]
+            offset = address - device.offset
+            return f"{name}[{offset >> 8:#04x}][{offset & 0xff:#04x}]"
+
+        lines = []
+        for address, instruction, value in translated:
+            if value is None:
+                lines.append(f"index = {read(address + 1)} | {read(address + 2)} << 8")
+                value = "index"
+            lines += instruction.translate(address, value if isinstance(value, str) else f"{value:#06x}", read(value))
+        namespace = {}
+        instrumentation = []
+        for observer in self.cpu.observers:
+            observer_lines, observer_namespace = observer.translate(translated)
+            instrumentation += observer_lines
+            namespace.update(observer_namespace)
+        body = instrumentation + ["acc = cpu.acc"]
+        for name in ("read", "write"):
+            if any(f"{name}(" in line for line in lines):
+                body.append(f"{name} = cpu.bus.{name}")
+        body += [f"{name} = cpu.bus.pages[{address >> 8:#04x}].pages" for name, address in memories.values()]
+        body += lines
+        if not last.branches:
+            body.append(f"pc = {end:#06x}")
+        body += ["cpu.acc = acc", "cpu.pc = pc", f"cpu.index = {'index' if operand is None else f'{operand:#06x}'}",
+                 f"cpu.instruction = cpu.instructions[{last.opcode:#04x}]"]
+        if any(line.startswith("buffer = ") for line in lines):
+            body.append("cpu.buffer = buffer")
+        source = "def block(cpu):\n" + "".join(f"    {line}\n" for line in body)
+        exec(compile(source, f"<block {start:#06x}>", "exec"), namespace)
+        return namespace["block"]
+
+    def _code(self, pc):
+        # The bytes from pc up to the end of the longest block that could start there, or up to the first
+        # byte that is not memory.
+        bus = self.cpu.bus
+        end = min(pc + self.max_instructions * 3, bus.address_space)
+        code = bytearray()
+        address = pc
+        while address < end:
+            device = bus.device(address)
+            if not isinstance(device, computer.Memory):
+                break
+            page_end = min((address | 0xff) + 1, end)
+            code += device.read_page(address, page_end)
+            address = page_end
+        return code
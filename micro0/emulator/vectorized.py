@@ -0,0 +1,132 @@
+import numpy as np
+
+from micro0.emulator.computer import CharacterOutput, IllegalOpcode, INSTRUCTION_SET, CYCLES, CHAR_OUT, KEYBOARD, \
+    TIMER, DISPLAY
+
+
+class VectorSystem:
+    # Runs many copies of System in lockstep, one instruction per machine per step, with registers and
+    # memories held in NumPy arrays. Machines that have taken a different branch simply sit at a
+    # different pc; every opcode is applied through a mask of the machines that fetched it.
+    # The device pages of memory hold what System's devices would read back, so loads need no special
+    # case: the display cells start out as spaces, and the timer's control and period registers keep
+    # what was stored to them. Machines have no keyboard input and their timers never run, even when the
+    # guest starts them, so the keyboard registers and the timer's expired flag always read zero. Stores
+    # to any other device address are dropped, as they are on System.
+    char_out_offset = CHAR_OUT
+    keyboard_offset = KEYBOARD
+    timer_offset = TIMER
+    display_offset = DISPLAY
+    # System's display has the default 40 x 25 grid.
+    display_size = 40 * 25
+
+    def __init__(self, count):
+        self.count = count
+        self.memory = np.zeros((count, 0x10000), dtype=np.uint8)
+        self.memory[:, self.display_offset:self.display_offset + self.display_size] = ord(" ")
+        self.pc = np.zeros(count, dtype=np.int64)
+        self.acc = np.zeros(count, dtype=np.int64)
+        self.index = np.zeros(count, dtype=np.int64)
+        self.buffer = np.zeros(count, dtype=np.int64)
+        self.tick_counter = np.zeros(count, dtype=np.int64)
+        self.halted = np.zeros(count, dtype=bool)
+        self.char_out = [CharacterOutput(self.char_out_offset) for _ in range(count)]
+        self.timings = np.zeros(0x100, dtype=np.int64)
+        # wait has no vectorized form, so it traps like an illegal opcode.
+        for instruction in INSTRUCTION_SET:
+            if not instruction.waits:
+                self.timings[instruction.opcode] = CYCLES[instruction.opcode]
+
+    def load(self, binary, machines=None):
+        # Like System.load, only memory below the devices is loaded; the devices are reset.
+        rows = slice(None) if machines is None else machines
+        self.memory[rows, :] = 0
+        for origin, data in getattr(binary, "segments", [(0, binary)]):
+            data = np.frombuffer(bytes(data), dtype=np.uint8)[:max(self.char_out_offset - origin, 0)]
+            self.memory[rows, origin:origin + len(data)] = data
+        self.memory[rows, self.display_offset:self.display_offset + self.display_size] = ord(" ")
+
+    def display(self, machine):
+        # The display cells, as System.display.cells would hold them.
+        return self.memory[machine, self.display_offset:self.display_offset + self.display_size].tobytes()
+
+    def patch(self, machine, address, data):
+        self.memory[machine, address:address + len(data)] = np.frombuffer(bytes(data), dtype=np.uint8)
+
+    def state(self, machine):
+        return (int(self.pc[machine]), int(self.acc[machine]), int(self.index[machine]),
+                int(self.tick_counter[machine]))
+
+    def run(self, cycles):
+        remaining = np.full(self.count, cycles, dtype=np.int64)
+        rows = np.arange(self.count)
+        memory = self.memory
+        self.halted[:] = False
+        while True:
+            opcode = memory[rows, self.pc].astype(np.int64)
+            cost = self.timings[opcode] - self.tick_counter
+            self._check_opcodes(opcode, remaining)
+            active = np.nonzero((remaining >= cost) & (remaining > 0) & (self.timings[opcode] > 0))[0]
+            if len(active) == 0:
+                break
+            pc = self.pc[active]
+            self._execute(active, opcode[active])
+            remaining[active] -= cost[active]
+            self.tick_counter[active] = 0
+            # A branch to itself with acc == 0 spins forever, so skip straight to the end of its budget.
+            spinning = active[(opcode[active] == 0x04) & (self.pc[active] == pc)]
+            remaining[spinning] %= self.timings[0x04]
+            self.halted[spinning] = True
+        self._partial(rows[remaining > 0], remaining[remaining > 0])
+
+    def _check_opcodes(self, opcode, remaining):
+        # Cpu.tick traps on the tick after the fetch.
+        fetching = (self.tick_counter < 3) & (remaining >= 3 - self.tick_counter)
+        illegal = np.nonzero(fetching & (self.timings[opcode] == 0))[0]
+        if len(illegal):
+            raise IllegalOpcode(int(opcode[illegal[0]]), int(self.pc[illegal[0]]))
+
+    def _execute(self, active, opcode):
+        memory = self.memory
+        pc = self.pc[active]
+        operand = memory[active, pc + 1].astype(np.int64) | (memory[active, pc + 2].astype(np.int64) << 8)
+        self.index[active] = operand
+        acc = self.acc[active]
+
+        load = opcode == 0x01
+        acc[load] = memory[active[load], operand[load]]
+
+        store = opcode == 0x02
+        to_memory = store & ((operand < self.char_out_offset) |
+                             (operand > self.timer_offset) & (operand < self.timer_offset + 4) |
+                             (operand >= self.display_offset) & (operand < self.display_offset + self.display_size))
+        memory[active[to_memory], operand[to_memory]] = acc[to_memory]
+        to_output = store & (operand >= self.char_out_offset) & (operand < self.keyboard_offset)
+        for machine, value in zip(active[to_output], acc[to_output]):
+            self.char_out[machine].buffer.append(int(value))
+
+        add = opcode == 0x03
+        buffer = memory[active[add], operand[add]].astype(np.int64)
+        self.buffer[active[add]] = buffer
+        acc[add] = (acc[add] + buffer) % 0x100
+
+        taken = (opcode == 0x04) & (acc == 0)
+        self.pc[active] = np.where(taken, operand, pc + 3)
+        self.acc[active] = acc
+
+    def _partial(self, machines, ticks):
+        # Machines whose budget ran out inside an instruction end up with the same half-executed state as
+        # Cpu.tick would leave behind.
+        if len(machines) == 0:
+            return
+        memory = self.memory
+        before = self.tick_counter[machines]
+        after = before + ticks
+        self.tick_counter[machines] = after
+        pc = self.pc[machines]
+        low = (before < 3) & (after >= 3)
+        self.index[machines[low]] = memory[machines[low], pc[low] + 1]
+        high = (before < 4) & (after >= 4)
+        self.index[machines[high]] += memory[machines[high], pc[high] + 2].astype(np.int64) << 8
+        add = (memory[machines, pc] == 0x03) & (before < 5) & (after >= 5)
+        self.buffer[machines[add]] = memory[machines[add], self.index[machines[add]]]
@@ -0,0 +1,279 @@
+from myhdl import Signal, TristateSignal, ResetSignal, intbv, block, always, instance, delay, StopSimulation
+
+from micro0.emulator.computer import CYCLES, IllegalOpcode, LoadDirect, StoreDirect, AddDirect, BranchIfZeroSet
+from micro0.simulator.components import Register, Memory, ProgramCounter
+
+# The instructions simulate() can replay, and the simulation clocks it spends on every emulator cycle.
+SIMULATED = {LoadDirect.opcode, StoreDirect.opcode, AddDirect.opcode, BranchIfZeroSet.opcode}
+CLOCKS_PER_CYCLE = 3
+
+
+class NotSimulated(Exception):
+    # Raised by simulate() at an instruction it cannot replay, such as wait. cycle is where that instruction
+    # starts, counted from the start of the replay, and events are what the replay recorded before it.
+    def __init__(self, cycle, opcode, events):
+        super().__init__(f"no simulation for opcode {opcode:#04x} at cycle {cycle}")
+        self.cycle = cycle
+        self.opcode = opcode
+        self.events = events
+
+
+class Divergence:
+    # cycle is the emulator cycle of the first mismatch, counted from the start of the lockstep run.
+    # expected is what the emulator did and actual what the simulation did; either is None if that side
+    # stopped early.
+    def __init__(self, cycle, expected, actual):
+        self.cycle = cycle
+        self.expected = expected
+        self.actual = actual
+
+    def __repr__(self):
+        return f"Divergence(cycle {self.cycle}: emulator {self.expected}, simulator {self.actual})"
+
+
+class RecordingBus:
+    # Passes accesses through to the system bus and logs them with the tick they happened on.
+    def __init__(self, bus, events):
+        self.bus = bus
+        self.events = events
+        self.tick = 0
+
+    def read(self, offset):
+        value = self.bus.read(offset)
+        self.events.append((self.tick, "read", offset, value))
+        return value
+
+    def write(self, offset, value):
+        self.bus.write(offset, value)
+        self.events.append((self.tick, "write", offset, value))
+
+
+def record(system, ticks):
+    # Ticks the system's cpu for at least ticks cycles, up to the next instruction boundary, and returns its
+    # bus accesses followed by a ("registers", pc, acc, index) event after every instruction. The system's
+    # clock advances with every tick, as in System.run, so scheduled events fire on the same cycles.
+    cpu = system.cpu
+    queue = system.events
+    events = []
+    bus = RecordingBus(cpu.bus, events)
+    cpu.bus = bus
+    try:
+        while bus.tick < ticks or cpu.tick_counter != 0:
+            queue.advance()
+            try:
+                cpu.tick()
+            except IllegalOpcode:
+                break
+            queue.now += 1
+            bus.tick += 1
+            if cpu.tick_counter == 0:
+                events.append((bus.tick, "registers", cpu.pc, cpu.acc, cpu.index))
+    finally:
+        cpu.bus = bus.bus
+    queue.advance()
+    return events, bus.tick
+
+
+def simulate(contents, pc, acc, ticks):
+    # Replays whole instructions for up to ticks emulator cycles on the simulator components, starting from
+    # the given memory contents and registers. There is no cpu in the simulator yet, so a sequencer drives
+    # the components' control lines through the same steps as Cpu._tick, one emulator cycle every
+    # CLOCKS_PER_CYCLE clocks. Cycles are counted from the simulation's clock, not taken from the emulator's
+    # timing, so an instruction that takes a cycle too many or too few shows up as a divergence.
+    # Returns the same kind of events as record() and the cycle the replay ended on. Raises NotSimulated at
+    # an instruction the sequencer has no steps for.
+    events = []
+    end = [0]
+    clocks = [0]
+    unsimulated = []
+
+    @block
+    def testbench():
+        clk = Signal(bool(0))
+        reset = ResetSignal(1, active=0, isasync=True)
+        data_bus = TristateSignal(intbv(0)[8:])
+        data_bus_drive = data_bus.driver()
+        address = Signal(intbv(0)[16:])
+        pc_bus = TristateSignal(intbv(0)[16:])
+        pc_in = Signal(intbv(0)[8:])
+        mem_we, mem_oe = Signal(bool(0)), Signal(bool(0))
+        wel, weh, pc_oe, ce = Signal(bool(0)), Signal(bool(0)), Signal(bool(1)), Signal(bool(0))
+        sel_index, sel_alu = Signal(bool(0)), Signal(bool(0))
+        bus_in = Signal(intbv(0)[8:])
+        acc_in = Signal(intbv(0)[8:])
+
+        memory = Memory(contents)
+        counter = ProgramCounter(pc & 0xff)
+        counter.pch = Signal(intbv(pc >> 8)[8:])
+        registers = {}
+        blocks = [memory.block(mem_we, mem_oe, address, data_bus, clk),
+                  counter.block(wel, weh, pc_oe, ce, pc_in, pc_bus.driver(), clk)]
+        for name, initial, data_in in (("ir", 0, bus_in), ("lo", 0, bus_in), ("hi", 0, bus_in),
+                                       ("buffer", 0, bus_in), ("acc", acc, acc_in)):
+            register = Register()
+            register.data = Signal(intbv(initial)[8:])
+            we, data_out = Signal(bool(0)), Signal(intbv(initial)[8:])
+            registers[name] = (register, we)
+            blocks.append(register.block(we, data_in, data_out, clk, reset))
+
+        def value(name):
+            return int(registers[name][0].data.val)
+
+        @always(delay(10))
+        def clkgen():
+            clk.next = not clk
+
+        @always(data_bus, sel_alu, registers["acc"][0].data, registers["buffer"][0].data)
+        def data_path():
+            data = 0 if data_bus.val is None else int(data_bus.val)
+            bus_in.next = data
+            acc_in.next = (value("acc") + value("buffer")) % 0x100 if sel_alu else data
+
+        @always(sel_index, pc_bus, registers["lo"][0].data, registers["hi"][0].data)
+        def address_path():
+            if sel_index:
+                address.next = value("hi") << 8 | value("lo")
+            else:
+                address.next = 0 if pc_bus.val is None else int(pc_bus.val)
+
+        def clock():
+            yield clk.posedge
+            yield clk.negedge
+            clocks[0] += 1
+
+        def now():
+            # The emulator cycle the simulation is in.
+            return clocks[0] // CLOCKS_PER_CYCLE
+
+        def finish_cycle():
+            while clocks[0] % CLOCKS_PER_CYCLE:
+                yield from clock()
+
+        def read(from_index, target, increment):
+            # One idle clock lets the program counter output catch up with the last increment.
+            yield from clock()
+            sel_index.next = from_index
+            mem_oe.next = 1
+            yield from clock()
+            data = int(data_bus.val)
+            events.append((now(), "read", int(address.val), data))
+            mem_oe.next = 0
+            registers[target][1].next = 1
+            ce.next = increment
+            yield from clock()
+            registers[target][1].next = 0
+            ce.next = 0
+            return data
+
+        @instance
+        def sequencer():
+            while now() < ticks:
+                start, recorded = now(), len(events)
+                yield from clock()
+                yield from finish_cycle()
+                opcode = yield from read(False, "ir", True)
+                if opcode not in SIMULATED:
+                    # The emulator side only keeps what happened before the instruction.
+                    del events[recorded:]
+                    if opcode in CYCLES:
+                        unsimulated.append((start, opcode))
+                    end[0] = start
+                    raise StopSimulation
+                yield from read(False, "lo", True)
+                yield from read(False, "hi", True)
+                if opcode == LoadDirect.opcode:
+                    yield from read(True, "acc", False)
+                elif opcode == AddDirect.opcode:
+                    yield from read(True, "buffer", False)
+                    sel_alu.next = 1
+                    registers["acc"][1].next = 1
+                    yield from clock()
+                    sel_alu.next = 0
+                    registers["acc"][1].next = 0
+                elif opcode == StoreDirect.opcode:
+                    sel_index.next = 1
+                    yield from clock()
+                    events.append((now(), "write", int(address.val), value("acc")))
+                    data_bus_drive.next = value("acc")
+                    mem_we.next = 1
+                    yield from clock()
+                    data_bus_drive.next = None
+                    mem_we.next = 0
+                elif value("acc") == 0:
+                    pc_in.next = value("lo")
+                    wel.next = 1
+                    yield from clock()
+                    pc_in.next = value("hi")
+                    wel.next = 0
+                    weh.next = 1
+                    yield from clock()
+                    weh.next = 0
+                else:
+                    yield from clock()
+                yield from finish_cycle()
+                if now() > ticks:
+                    # The instruction does not fit in the window, so the emulator side leaves it out.
+                    del events[recorded:]
+                    end[0] = start
+                    raise StopSimulation
+                pc_value = int(counter.pch.val) << 8 | int(counter.pcl.val)
+                events.append((now(), "registers", pc_value, value("acc"), value("hi") << 8 | value("lo")))
+            end[0] = now()
+            raise StopSimulation
+
+        return clkgen, data_path, address_path, sequencer, blocks
+
+    testbench().run_sim(quiet=1)
+    if unsimulated:
+        raise NotSimulated(*unsimulated[0], events)
+    return events, end[0]
+
+
+class Lockstep:
+    # Runs a system on the fast emulator and every interval cycles replays a window of about window cycles on
+    # the simulator components as well, comparing bus accesses cycle by cycle and registers after every
+    # instruction. The simulator memory starts from a copy of the emulator's Memory, so reads from other
+    # devices, such as the keyboard, are expected to diverge. A window that reaches an instruction the
+    # simulator cannot replay is only compared up to it, and the emulator cycle it stopped at is added to
+    # unsimulated.
+    def __init__(self, system, window=200, interval=10000):
+        self.system = system
+        self.window = window
+        self.interval = interval
+        self.cycle = 0
+        self.windows = 0
+        self.unsimulated = []
+
+    def check_window(self):
+        cpu = self.system.cpu
+        start = self.cycle
+        contents = [int(byte) for byte in self.system.memory.view()]
+        contents += [0] * (0x10000 - len(contents))
+        try:
+            actual, end = simulate(contents, cpu.pc, cpu.acc, self.window)
+        except NotSimulated as error:
+            actual, end = error.events, error.cycle
+            self.unsimulated.append(start + end)
+        expected, ticks = record(self.system, self.window)
+        self.cycle += ticks
+        self.windows += 1
+        expected = [event for event in expected if event[0] <= end]
+        for index in range(max(len(expected), len(actual))):
+            left = expected[index] if index < len(expected) else None
+            right = actual[index] if index < len(actual) else None
+            if left != right:
+                return Divergence(start + min(event[0] for event in (left, right) if event is not None), left, right)
+        return None
+
+    def run(self, cycles):
+        # Returns the first Divergence, or None if every window matched.
+        end = self.cycle + cycles
+        while self.cycle < end:
+            divergence = self.check_window()
+            if divergence is not None:
+                return divergence
+            count = min(self.interval, end - self.cycle)
+            self.cycle += self.system.run(count)
+            while self.system.cpu.tick_counter != 0:
+                self.cycle += self.system.run(1)
+        return None
@@ -0,0 +1,75 @@
+import unittest
+
+from micro0.emulator.computer import AddDirect, LoadDirect
+from micro0.simulator.lockstep import Lockstep, NotSimulated, record, simulate
+from micro0.test_programs import COUNTER, make_system
+
+WAITS = """
+            .org 0x0
+            load [one]
+            add [one]
+            wait
+            store [0x1000]
+
+            .org 0x1000
+one:        db 0x01
+"""
+
+
+class OffByOneAdd(AddDirect):
+    def tick(self, cpu):
+        super().tick(cpu)
+        if cpu.tick_counter == 0:
+            cpu.acc = (cpu.acc + 1) % 0x100
+
+
+class SlowLoad(LoadDirect):
+    microcode = (("operand_low",), ("operand_high",), (), ("load", "next"))
+
+
+class TestLockstep(unittest.TestCase):
+    def test_window_events(self):
+        system = make_system(COUNTER)
+        contents = [int(byte) for byte in system.memory.view()]
+        actual, end = simulate(contents, 0x0000, 0x00, 31)
+        expected, ticks = record(system, 31)
+        self.assertEqual(31, end)
+        self.assertEqual(31, ticks)
+        self.assertEqual(expected, actual)
+        self.assertEqual((4, "read", 0x1000, 0xfd), actual[3])
+        self.assertEqual((15, "write", 0x1000, 0xfe), actual[13])
+        self.assertEqual((31, "registers", 0x0000, 0x00, 0x0000), actual[-1])
+
+    def test_run_matches(self):
+        lockstep = Lockstep(make_system(COUNTER), window=60, interval=100)
+        self.assertIsNone(lockstep.run(400))
+        self.assertEqual(3, lockstep.windows)
+        self.assertGreaterEqual(lockstep.cycle, 400)
+        self.assertEqual(lockstep.cycle, lockstep.system.cycle)
+
+    def test_reports_first_divergence(self):
+        system = make_system(COUNTER)
+        system.cpu.instructions[0x03] = OffByOneAdd()
+        divergence = Lockstep(system, window=60).run(400)
+        self.assertEqual(11, divergence.cycle)
+        self.assertEqual((11, "registers", 0x0006, 0xff, 0x1001), divergence.expected)
+        self.assertEqual((11, "registers", 0x0006, 0xfe, 0x1001), divergence.actual)
+
+    def test_reports_wrong_timing(self):
+        system = make_system(COUNTER)
+        system.cpu.instructions[0x01] = SlowLoad()
+        divergence = Lockstep(system, window=60).run(400)
+        self.assertEqual(4, divergence.cycle)
+        self.assertEqual((5, "read", 0x1000, 0xfd), divergence.expected)
+        self.assertEqual((4, "read", 0x1000, 0xfd), divergence.actual)
+
+    def test_wait_is_not_simulated(self):
+        system = make_system(WAITS)
+        contents = [int(byte) for byte in system.memory.view()]
+        with self.assertRaises(NotSimulated) as context:
+            simulate(contents, 0x0000, 0x00, 60)
+        self.assertEqual((11, 0x05), (context.exception.cycle, context.exception.opcode))
+        self.assertEqual((11, "registers", 0x0006, 0x02, 0x1000), context.exception.events[-1])
+        lockstep = Lockstep(system, window=60, interval=100)
+        self.assertIsNone(lockstep.run(100))
+        self.assertEqual([11], lockstep.unsimulated)
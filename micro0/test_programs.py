@@ -0,0 +1,112 @@
+# Guest programs and helpers shared by the tests and benchmarks. Nothing outside of those imports this module.
+from micro0.assembler.assembler import Assembler
+from micro0.emulator.computer import System
+
+# Prints "Hello World!" a character at a time. The load at i is patched on every pass with the index of the
+# next character.
+HELLO_WORLD = """
+            .org 0x0
+            load [zero]
+            store [index]
+repeat:     load [index]
+            store [0x000D]
+i:          load [0x1000]
+            brz [finished]
+            store [0xf000]
+            load [index]
+            add [one]
+            store [index]
+            load [zero]
+            brz [repeat]
+finished:   brz [finished]
+
+            .org 0x1000
+string:     db 0x48
+            db 0x65
+            db 0x6c
+            db 0x6c
+            db 0x6f
+            db 0x20
+            db 0x57
+            db 0x6f
+            db 0x72
+            db 0x6c
+            db 0x64
+            db 0x21
+            db 0x00
+zero:       db 0x00
+one:        db 0x01
+index:      db 0x00
+"""
+
+# Counts up from 0xfd, 31 cycles per pass, and parks at finished once count wraps round to zero.
+COUNTER = """
+            .org 0x0
+repeat:     load [count]
+            add [one]
+            store [count]
+            brz [finished]
+            load [zero]
+            brz [repeat]
+finished:   brz [finished]
+
+            .org 0x1000
+count:      db 0xfd
+one:        db 0x01
+zero:       db 0x00
+"""
+
+# Counts up from zero forever and prints every count, one character every 31 cycles.
+PRINTER = """
+            .org 0x0
+repeat:     load [count]
+            add [one]
+            store [count]
+            store [0xf000]
+            load [zero]
+            brz [repeat]
+
+            .org 0x1000
+count:      db 0x00
+one:        db 0x01
+zero:       db 0x00
+"""
+
+# Polls the keyboard and echoes every byte it reads to the character output.
+ECHO = """
+            .org 0x0
+poll:       load [0xf100]   /* Keyboard status */
+            brz [poll]
+            load [0xf101]   /* Keyboard data */
+            store [0xf000]
+            load [zero]
+            brz [poll]
+
+            .org 0x1000
+zero:       db 0x00
+"""
+
+# Copies the 256 bytes at 0x2000 to 0x3000 by patching the low operand bytes of the load and the store.
+MEMCPY = """
+            .org 0x0
+repeat:     load [0x2000]
+            store [0x3000]
+            load [0x0001]
+            add [one]
+            store [0x0001]
+            store [0x0004]
+            brz [finished]
+            load [zero]
+            brz [repeat]
+finished:   brz [finished]
+
+            .org 0x1000
+zero:       db 0x00
+one:        db 0x01
+"""
+
+
+def make_system(source, translate=False, sink=None):
+    system = System(translate, sink)
+    system.load(Assembler().assemble(source))
+    return system